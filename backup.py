@@ -0,0 +1,360 @@
+import os
+import csv
+import gzip
+import json
+import shutil
+import datetime
+
+from db_handler import (
+    stream_query,
+    read_max_keys,
+    backup_database,
+    close_connections,
+    get_db_path,
+    date_range_conditions,
+    ENTRIES_COLUMNS,
+    REWORK_LOG_COLUMNS,
+)
+
+BACKUP_ROOT = "backups"
+INCREMENTAL_DIR = os.path.join(BACKUP_ROOT, "incremental")
+MANIFEST_NAME = "manifest.json"
+SNAPSHOT_DIR = os.path.join(BACKUP_ROOT, "snapshots")
+SNAPSHOT_PREFIX = "snapshot_"
+SNAPSHOT_SUFFIX = ".db.gz"
+# Microseconds keep two snapshots taken in the same second apart; names from
+# before they were added have none.
+SNAPSHOT_STAMP_FORMATS = ("%Y%m%d_%H%M%S_%f", "%Y%m%d_%H%M%S")
+
+# Snapshot retention: newest snapshot of each of the last N hours / days.
+KEEP_HOURLY = 24
+KEEP_DAILY = 14
+
+# Excel's hard limit, including the header row.
+EXCEL_MAX_ROWS = 1048576
+
+# Tables covered by incremental backups and the key each is watermarked on.
+# Both keys are AUTOINCREMENT, so new rows always get a larger key.
+INCREMENTAL_TABLES = (("rework_log", "id"), ("entries", "sr_no"))
+TABLE_COLUMNS = {"rework_log": REWORK_LOG_COLUMNS, "entries": ENTRIES_COLUMNS}
+# INTEGER columns, converted back from CSV text when rebuilding a full export;
+# everything else (PCB IDs, reasons) stays text exactly as stored.
+INTEGER_COLUMNS = ("sr_no", "id", "rework_no")
+
+
+class _XlsxSheetWriter:
+    """Writes rows to a sheet, continuing on name_2, name_3, ... at the
+    Excel row limit."""
+
+    def __init__(self, workbook, name, columns, header_format=None):
+        self.workbook = workbook
+        self.name = name
+        self.columns = columns
+        self.header_format = header_format
+        self.sheet_no = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self.sheet_no += 1
+        name = self.name if self.sheet_no == 1 else f"{self.name}_{self.sheet_no}"
+        self.sheet = self.workbook.add_worksheet(name[:31])
+        self.sheet.write_row(0, 0, self.columns, self.header_format)
+        self.row_no = 1
+
+    def write_rows(self, rows):
+        for row in rows:
+            if self.row_no >= EXCEL_MAX_ROWS:
+                self._new_sheet()
+            self.sheet.write_row(self.row_no, 0, row)
+            self.row_no += 1
+
+
+def export_queries_xlsx(filename, queries):
+    """Streams several queries into one .xlsx file, one sheet each.
+
+    queries is a list of (sheet_name, sql, params). Rows are written as they
+    are fetched, with xlsxwriter in constant_memory mode, so memory use does
+    not grow with the table. Returns {sheet_name: row_count}.
+    """
+    import xlsxwriter  # loaded on first export, not at app startup
+
+    workbook = xlsxwriter.Workbook(filename, {"constant_memory": True})
+    header_format = workbook.add_format({"bold": True})
+    counts = {}
+    try:
+        for sheet_name, sql, params in queries:
+            columns, chunks = stream_query(sql, params)
+            writer = _XlsxSheetWriter(workbook, sheet_name, columns, header_format)
+            counts[sheet_name] = 0
+            for rows in chunks:
+                writer.write_rows(rows)
+                counts[sheet_name] += len(rows)
+    finally:
+        workbook.close()
+    return counts
+
+
+def export_query_xlsx(filename, sql, params=(), sheet_name="rework_log"):
+    """Streams a single query into an .xlsx file and returns the row count."""
+    return export_queries_xlsx(filename, [(sheet_name, sql, params)])[sheet_name]
+
+
+def write_backup(start=None, end=None, shift=None):
+    """Exports rework_log to a timestamped Excel file and returns its path.
+
+    start/end/shift limit the export to a date range and/or shift, as for
+    db_handler.fetch_rework_log_page.
+    """
+    # create datewise folder (YYYY-MM-DD)
+    now = datetime.datetime.now()
+    backup_dir = os.path.join(BACKUP_ROOT, now.strftime("%Y-%m-%d"))
+    os.makedirs(backup_dir, exist_ok=True)
+
+    # filename with timestamp inside datewise folder
+    filename = os.path.join(backup_dir, f"backup_{now.strftime('%Y%m%d_%H%M%S')}.xlsx")
+    conditions, params = date_range_conditions("rework_epoch", start, end, shift)
+    sql = f"SELECT {REWORK_LOG_COLUMNS} FROM rework_log"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    export_query_xlsx(filename, sql + " ORDER BY id", params)
+    return filename
+
+
+# ---------- Incremental backups ----------
+# Each run exports only rows whose key is above the watermark recorded in
+# backups/incremental/manifest.json, as one CSV per table. The manifest lists
+# every increment with the key range it covers, so the chain can be checked
+# and stitched back into a full export.
+
+
+def load_manifest(backup_dir=INCREMENTAL_DIR):
+    path = os.path.join(backup_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {
+            "watermarks": {table: 0 for table, _ in INCREMENTAL_TABLES},
+            "increments": [],
+        }
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest, backup_dir):
+    path = os.path.join(backup_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def write_incremental_backup(backup_dir=INCREMENTAL_DIR):
+    """Exports rows added since the last increment and returns its manifest
+    record, or None when nothing new has been written.
+
+    The upper bound of each table is read before exporting, so rows inserted
+    while the export runs are left for the next increment.
+    """
+    manifest = load_manifest(backup_dir)
+    upper = read_max_keys(INCREMENTAL_TABLES)
+    if all(
+        upper[table] <= manifest["watermarks"].get(table, 0)
+        for table, _ in INCREMENTAL_TABLES
+    ):
+        return None
+
+    now = datetime.datetime.now()
+    day_dir = os.path.join(backup_dir, now.strftime("%Y-%m-%d"))
+    os.makedirs(day_dir, exist_ok=True)
+    stamp = f"{now.strftime('%Y%m%d_%H%M%S')}_{len(manifest['increments']) + 1:05d}"
+
+    record = {"created": now.strftime("%Y-%m-%d %H:%M:%S"), "tables": {}}
+    for table, key in INCREMENTAL_TABLES:
+        low = manifest["watermarks"].get(table, 0)
+        high = max(low, upper[table])
+        filename = os.path.join(day_dir, f"{table}_{stamp}.csv")
+        rows = _export_range_csv(filename, table, key, low, high)
+        record["tables"][table] = {
+            "file": os.path.relpath(filename, backup_dir),
+            "after": low,
+            "through": high,
+            "rows": rows,
+        }
+        manifest["watermarks"][table] = high
+
+    manifest["increments"].append(record)
+    _save_manifest(manifest, backup_dir)
+    return record
+
+
+def _export_range_csv(filename, table, key, low, high):
+    columns, chunks = stream_query(
+        f"SELECT {TABLE_COLUMNS[table]} FROM {table} "
+        f"WHERE {key} > ? AND {key} <= ? ORDER BY {key}",
+        (low, high),
+    )
+    count = 0
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def rebuild_full_export(filename, backup_dir=INCREMENTAL_DIR):
+    """Stitches the chain of increments into one .xlsx with a sheet per table.
+
+    Raises ValueError if an increment is missing or the key ranges in the
+    manifest do not join up. Returns {table: row_count}.
+    """
+    import xlsxwriter  # loaded on first export, not at app startup
+
+    manifest = load_manifest(backup_dir)
+    workbook = xlsxwriter.Workbook(filename, {"constant_memory": True})
+    header_format = workbook.add_format({"bold": True})
+    counts = {}
+    try:
+        for table, _ in INCREMENTAL_TABLES:
+            writer = None
+            expected_after = 0
+            counts[table] = 0
+            for record in manifest["increments"]:
+                part = record["tables"].get(table)
+                if part is None:
+                    continue
+                if part["after"] != expected_after:
+                    raise ValueError(
+                        f"{table}: increment from {record['created']} starts after "
+                        f"{part['after']}, expected {expected_after}"
+                    )
+                expected_after = part["through"]
+                path = os.path.join(backup_dir, part["file"])
+                if not os.path.exists(path):
+                    raise ValueError(f"{table}: missing increment {path}")
+                with open(path, "r", newline="", encoding="utf-8") as f:
+                    reader = csv.reader(f)
+                    columns = next(reader)
+                    if writer is None:
+                        writer = _XlsxSheetWriter(
+                            workbook, table, columns, header_format
+                        )
+                    integers = [
+                        i for i, name in enumerate(columns) if name in INTEGER_COLUMNS
+                    ]
+                    for row in reader:
+                        for i in integers:
+                            row[i] = int(row[i])
+                        writer.write_rows([row])
+                        counts[table] += 1
+    finally:
+        workbook.close()
+    return counts
+
+
+# ---------- Database snapshots ----------
+# Restorable copies of the whole rework_data.db (all tables), taken online
+# with the sqlite3 backup API, gzip-compressed and pruned by a retention policy.
+
+
+def write_snapshot_backup(
+    snapshot_dir=SNAPSHOT_DIR, keep_hourly=KEEP_HOURLY, keep_daily=KEEP_DAILY
+):
+    """Takes a compressed snapshot of the live database and applies retention.
+
+    Returns the path of the new snapshot.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    now = datetime.datetime.now()
+    name = f"{SNAPSHOT_PREFIX}{now.strftime(SNAPSHOT_STAMP_FORMATS[0])}"
+    raw_path = os.path.join(snapshot_dir, name + ".db.tmp")
+    gz_tmp_path = os.path.join(snapshot_dir, name + SNAPSHOT_SUFFIX + ".tmp")
+    final_path = os.path.join(snapshot_dir, name + SNAPSHOT_SUFFIX)
+
+    try:
+        backup_database(raw_path)
+        with open(raw_path, "rb") as src:
+            with gzip.open(gz_tmp_path, "wb", compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(gz_tmp_path, final_path)
+    finally:
+        for path in (raw_path, gz_tmp_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    prune_snapshots(snapshot_dir, keep_hourly, keep_daily, protect=final_path)
+    return final_path
+
+
+def _snapshot_time(stamp):
+    for stamp_format in SNAPSHOT_STAMP_FORMATS:
+        try:
+            return datetime.datetime.strptime(stamp, stamp_format)
+        except ValueError:
+            pass
+    return None
+
+
+def list_snapshots(snapshot_dir=SNAPSHOT_DIR):
+    """Returns [(taken_at, path)] for every snapshot, newest first."""
+    if not os.path.isdir(snapshot_dir):
+        return []
+    snapshots = []
+    for filename in os.listdir(snapshot_dir):
+        if not filename.startswith(SNAPSHOT_PREFIX):
+            continue
+        if not filename.endswith(SNAPSHOT_SUFFIX):
+            continue
+        stamp = filename[len(SNAPSHOT_PREFIX) : -len(SNAPSHOT_SUFFIX)]
+        taken_at = _snapshot_time(stamp)
+        if taken_at is not None:
+            snapshots.append((taken_at, os.path.join(snapshot_dir, filename)))
+    snapshots.sort(reverse=True)
+    return snapshots
+
+
+def prune_snapshots(
+    snapshot_dir=SNAPSHOT_DIR,
+    keep_hourly=KEEP_HOURLY,
+    keep_daily=KEEP_DAILY,
+    protect=None,
+):
+    """Deletes snapshots that are neither the newest of one of the last
+    keep_hourly hours nor of one of the last keep_daily days, except the
+    path given as protect. Returns the deleted paths."""
+    keep = {protect}
+    hours = set()
+    days = set()
+    for taken_at, path in list_snapshots(snapshot_dir):
+        hour = taken_at.strftime("%Y%m%d%H")
+        day = taken_at.strftime("%Y%m%d")
+        if hour not in hours and len(hours) < keep_hourly:
+            hours.add(hour)
+            keep.add(path)
+        if day not in days and len(days) < keep_daily:
+            days.add(day)
+            keep.add(path)
+
+    deleted = []
+    for _, path in list_snapshots(snapshot_dir):
+        if path not in keep:
+            os.remove(path)
+            deleted.append(path)
+    return deleted
+
+
+def restore_snapshot(snapshot_path, db_path=None):
+    """Replaces the database file with a snapshot.
+
+    Closes db_handler's connections first; no other process may have the
+    database open while restoring.
+    """
+    db_path = db_path or get_db_path()
+    tmp_path = db_path + ".restore"
+    with gzip.open(snapshot_path, "rb") as src, open(tmp_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+    close_connections()
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.replace(tmp_path, db_path)
@@ -0,0 +1,336 @@
+"""Times db_handler operations on a generated dataset, for sizing and
+catching regressions between releases.
+
+    python benchmark.py [--pcbs 100000] [--models 20] [--reworks-per-pcb 1.3]
+                        [--json report.json] [--compare old_report.json]
+
+Generates a realistic scratch database (boards entered as rejections,
+most reworked once, some several times, the rest still pending), then
+times the calls the GUI makes: insert_entry, insert_rework, the Do Rework
+lookups, fetch_all_entries and the backups. --compare exits with status 1
+if any operation's median got slower than --threshold times the old one.
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import db_handler
+
+STAGES = ("AOI", "ICT", "FCT", "Visual", "X-Ray")
+REASONS = (
+    "Solder bridge",
+    "Missing component",
+    "Tombstoning",
+    "Insufficient solder",
+    "Wrong polarity",
+    "Lifted lead",
+    "Short circuit",
+    "Open joint",
+)
+ACTIONS = (
+    "Resoldered",
+    "Replaced component",
+    "Reflowed",
+    "Cleaned flux",
+    "Rotated part",
+)
+OPERATORS = tuple(f"op{i}" for i in range(1, 13))
+
+GENERATE_BATCH = 10000
+
+
+def _pcb_id(i):
+    return f"PCB{i:09d}"
+
+
+def _poisson(rng, mean):
+    """A Poisson-distributed count with the given mean (Knuth's method)."""
+    limit = math.exp(-mean)
+    count = 0
+    product = rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def generate_dataset(
+    pcbs=100000,
+    models=20,
+    reworks_per_pcb=1.3,
+    pending_fraction=0.05,
+    days=365,
+    seed=1,
+):
+    """Fills the current database with a synthetic history.
+
+    Every board gets a rejection entry; all but pending_fraction of them are
+    then reworked (entry deleted, as submit_rework does) with on average
+    reworks_per_pcb reworks (one plus a Poisson number of repeats). Goes
+    through the real triggers, so rollups, search and sync tables are
+    populated too. Returns the row counts.
+    """
+    rng = random.Random(seed)
+    model_names = [f"MODEL-{m:03d}" for m in range(1, models + 1)]
+    for name in model_names:
+        try:
+            db_handler.insert_model(name)
+        except sqlite3.IntegrityError:
+            pass
+
+    start = datetime.now() - timedelta(days=days)
+    extra_mean = max(reworks_per_pcb - 1, 0)
+    counts = {"entries": 0, "rework_log": 0, "pending": 0}
+
+    for first in range(0, pcbs, GENERATE_BATCH):
+        entries = []
+        reworks = []
+        reworked = []
+        for i in range(first, min(first + GENERATE_BATCH, pcbs)):
+            pcb_id = _pcb_id(i)
+            rejected_at = start + timedelta(seconds=days * 86400 * i / pcbs)
+            stamp = rejected_at.strftime("%Y-%m-%d %H:%M:%S")
+            entries.append(
+                (
+                    pcb_id,
+                    rng.choice(model_names),
+                    stamp,
+                    rng.choice(STAGES),
+                    rng.choice(REASONS),
+                )
+            )
+            if rng.random() < pending_fraction:
+                counts["pending"] += 1
+                continue
+            reworked.append((pcb_id,))
+            n = 1 + _poisson(rng, extra_mean)
+            done_at = rejected_at
+            for rework_no in range(1, n + 1):
+                done_at += timedelta(minutes=rng.randint(5, 600))
+                reworks.append(
+                    (
+                        pcb_id,
+                        rework_no,
+                        rng.choice(ACTIONS),
+                        done_at.strftime("%Y-%m-%d %H:%M:%S"),
+                        rng.choice(OPERATORS),
+                        db_handler.to_epoch(done_at),
+                    )
+                )
+
+        with db_handler.write_transaction() as cur:
+            cur.executemany(
+                """
+                INSERT INTO entries
+                    (pcb_id, model, timestamp, rejection_stage, rejection_details,
+                     ts_epoch)
+                VALUES (?1, ?2, ?3, ?4, ?5, CAST(strftime('%s', ?3) AS INTEGER))
+                """,
+                entries,
+            )
+            cur.executemany(
+                """
+                INSERT INTO rework_log (pcb_id, rework_no, rework_action, rework_date,
+                                        rework_done_by, rework_epoch)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                reworks,
+            )
+            cur.executemany("DELETE FROM entries WHERE pcb_id = ?", reworked)
+        counts["entries"] += len(entries)
+        counts["rework_log"] += len(reworks)
+    return counts
+
+
+def _summarise(samples):
+    samples = sorted(samples)
+
+    def pct(p):
+        return samples[min(len(samples) - 1, int(p / 100 * len(samples)))] * 1000
+
+    return {
+        "calls": len(samples),
+        "total_s": round(sum(samples), 4),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 4),
+        "p50_ms": round(pct(50), 4),
+        "p95_ms": round(pct(95), 4),
+        "p99_ms": round(pct(99), 4),
+        "max_ms": round(samples[-1] * 1000, 4),
+    }
+
+
+def _time_calls(func, arg_list):
+    samples = []
+    for args in arg_list:
+        started = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - started)
+    return _summarise(samples)
+
+
+def run_benchmarks(pcbs, calls, scratch, seed=2):
+    """Times each operation and returns {name: summary or {"skipped": why}}."""
+    import backup
+
+    rng = random.Random(seed)
+    cur = db_handler.get_connection().cursor()
+    cur.execute("SELECT pcb_id FROM entries")
+    pending = [row[0] for row in cur.fetchall()]
+    reworked = [_pcb_id(rng.randrange(pcbs)) for _ in range(calls)]
+    lookups = [(rng.choice(pending),) for _ in range(calls)] if pending else []
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    results = {}
+    results["insert_entry"] = _time_calls(
+        db_handler.insert_entry,
+        [
+            (f"BENCH{i:09d}", "MODEL-001", now, "AOI", "Solder bridge")
+            for i in range(calls)
+        ],
+    )
+    results["insert_rework"] = _time_calls(
+        db_handler.insert_rework,
+        [(pcb_id, "Resoldered", "bench") for pcb_id in reworked],
+    )
+    if lookups:
+        results["search_entry_by_pcbid"] = _time_calls(
+            db_handler.search_entry_by_pcbid, lookups
+        )
+    results["get_all_reworks_by_pcbid"] = _time_calls(
+        db_handler.get_all_reworks_by_pcbid, [(pcb_id,) for pcb_id in reworked]
+    )
+    results["get_pcb_snapshot"] = _time_calls(
+        db_handler.get_pcb_snapshot, [(pcb_id,) for pcb_id in reworked]
+    )
+    results["fetch_entries_page"] = _time_calls(
+        db_handler.fetch_entries_page, [()] * min(calls, 100)
+    )
+    results["fetch_all_entries"] = _time_calls(db_handler.fetch_all_entries, [()] * 3)
+
+    backup.BACKUP_ROOT = os.path.join(scratch, "backups")
+    try:
+        results["take_backup"] = _time_calls(backup.write_backup, [()])
+    except ImportError as e:
+        results["take_backup"] = {"skipped": f"xlsxwriter not installed ({e})"}
+    results["snapshot_backup"] = _time_calls(
+        backup.write_snapshot_backup, [(os.path.join(scratch, "snapshots"),)]
+    )
+    return results
+
+
+def compare_reports(old, new, threshold):
+    """Returns [(operation, old_p50_ms, new_p50_ms)] for medians that grew
+    by more than threshold times."""
+    regressions = []
+    for name, result in new["results"].items():
+        before = old.get("results", {}).get(name, {})
+        if "p50_ms" not in result or "p50_ms" not in before:
+            continue
+        if result["p50_ms"] > before["p50_ms"] * threshold:
+            regressions.append((name, before["p50_ms"], result["p50_ms"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pcbs", type=int, default=100000)
+    parser.add_argument("--models", type=int, default=20)
+    parser.add_argument("--reworks-per-pcb", type=float, default=1.3)
+    parser.add_argument("--pending-fraction", type=float, default=0.05)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--calls", type=int, default=1000, help="calls per operation")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep", help="keep the scratch database at this path")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--compare", help="an earlier --json report")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.mkdtemp(prefix="rework_bench_")
+    db_path = os.path.join(scratch, db_handler.DB_NAME)
+    try:
+        db_handler.set_db_path(db_path)
+        db_handler.init_db()
+
+        started = time.perf_counter()
+        dataset = generate_dataset(
+            args.pcbs,
+            args.models,
+            args.reworks_per_pcb,
+            args.pending_fraction,
+            args.days,
+            args.seed,
+        )
+        generate_s = time.perf_counter() - started
+        reworked = dataset["entries"] - dataset["pending"]
+        dataset["reworks_per_pcb"] = round(
+            dataset["rework_log"] / reworked if reworked else 0, 3
+        )
+        print(
+            f"generated {dataset['entries']} entries, {dataset['rework_log']} "
+            f"reworks ({dataset['pending']} pending, "
+            f"{dataset['reworks_per_pcb']} per reworked board) in {generate_s:.1f} s"
+        )
+
+        results = run_benchmarks(args.pcbs, args.calls, scratch)
+        db_handler.close_connections()
+        report = {
+            "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "schema_version": db_handler.SCHEMA_VERSION,
+            "parameters": {
+                key: getattr(args, key)
+                for key in (
+                    "pcbs",
+                    "models",
+                    "reworks_per_pcb",
+                    "pending_fraction",
+                    "days",
+                    "calls",
+                    "seed",
+                )
+            },
+            "dataset": dict(dataset, generate_s=round(generate_s, 2)),
+            "db_size_bytes": os.path.getsize(db_path),
+            "results": results,
+        }
+        if args.keep:
+            shutil.copy(db_path, args.keep)
+    finally:
+        db_handler.set_db_path(None)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"  {name:26} skipped: {result['skipped']}")
+        else:
+            print(
+                f"  {name:26} p50 {result['p50_ms']:9.3f} ms  "
+                f"p95 {result['p95_ms']:9.3f} ms  ({result['calls']} calls)"
+            )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare_reports(json.load(f), report, args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: p50 {before:.3f} ms -> {after:.3f} ms")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,150 @@
+import os
+import csv
+import datetime
+
+from db_handler import insert_entries_bulk
+
+# Accepted header names (case-insensitive, spaces or underscores) per field.
+COLUMN_ALIASES = {
+    "pcb_id": ("pcb_id", "pcb id", "pcbid", "serial_number"),
+    "model": ("model", "model_name"),
+    "rejection_stage": ("rejection_stage", "stage"),
+    "rejection_details": ("rejection_details", "details", "reason", "rejection_reason"),
+    "timestamp": ("timestamp", "date", "date_added"),
+}
+REQUIRED_COLUMNS = ("pcb_id", "model", "rejection_stage", "rejection_details")
+
+# Timestamps are stored as TIMESTAMP_FORMAT. ISO values (with "T", fractions
+# or an offset) are accepted as well as these day-first layouts.
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+DAY_FIRST_FORMATS = (
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+    "%d/%m/%Y",
+    "%d-%m-%Y %H:%M:%S",
+    "%d-%m-%Y %H:%M",
+    "%d-%m-%Y",
+    "%d.%m.%Y %H:%M:%S",
+    "%d.%m.%Y %H:%M",
+    "%d.%m.%Y",
+)
+
+
+def _normalise(header):
+    return str(header or "").strip().lower().replace(" ", "_")
+
+
+def _column_map(header):
+    """Maps each field to its index in the header row."""
+    names = [_normalise(h) for h in header]
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if _normalise(alias) in names:
+                mapping[field] = names.index(_normalise(alias))
+                break
+    missing = [field for field in REQUIRED_COLUMNS if field not in mapping]
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(missing)}")
+    return mapping
+
+
+def normalise_timestamp(value):
+    """Returns value as TIMESTAMP_FORMAT, or unchanged if it cannot be parsed
+    (insert_entries_bulk then reports the row as invalid)."""
+    if isinstance(value, datetime.datetime):
+        parsed = value
+    elif isinstance(value, datetime.date):
+        parsed = datetime.datetime.combine(value, datetime.time())
+    else:
+        value = str(value).strip()
+        try:
+            parsed = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            parsed = None
+            for fmt in DAY_FIRST_FORMATS:
+                try:
+                    parsed = datetime.datetime.strptime(value, fmt)
+                    break
+                except ValueError:
+                    pass
+            if parsed is None:
+                return value
+    if parsed.tzinfo is not None:
+        # stored times are naive local time
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.strftime(TIMESTAMP_FORMAT)
+
+
+def _read_sheet_rows(path):
+    """Yields raw rows (header first) from a .csv or .xlsx file."""
+    if path.lower().endswith(".xlsx"):
+        import openpyxl  # only needed for Excel imports
+
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield row
+        finally:
+            workbook.close()
+    else:
+        with open(path, "r", newline="", encoding="utf-8-sig") as f:
+            yield from csv.reader(f)
+
+
+def read_entry_records(path):
+    """Yields (line_no, pcb_id, model, timestamp, stage, details) from a file.
+
+    Rows without a timestamp column or value get the time of the import;
+    other timestamps are normalised with normalise_timestamp.
+    """
+    rows = _read_sheet_rows(path)
+    mapping = _column_map(next(rows, None) or [])
+    now = datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+
+    def cell(row, field):
+        index = mapping.get(field)
+        if index is None or index >= len(row) or row[index] is None:
+            return ""
+        value = row[index]
+        if isinstance(value, datetime.date):
+            return normalise_timestamp(value)
+        return str(value).strip()
+
+    def timestamp(row):
+        value = cell(row, "timestamp")
+        return normalise_timestamp(value) if value else now
+
+    for line_no, row in enumerate(rows, start=2):
+        if not any(str(v).strip() for v in row if v is not None):
+            continue
+        yield (
+            line_no,
+            cell(row, "pcb_id"),
+            cell(row, "model"),
+            timestamp(row),
+            cell(row, "rejection_stage"),
+            cell(row, "rejection_details"),
+        )
+
+
+def import_entries_file(path):
+    """Imports rejection entries from a CSV or XLSX file (see insert_entries_bulk)."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    return insert_entries_bulk(read_entry_records(path))
+
+
+def summarise_import(result, limit=15):
+    """Returns a short human-readable report of an import result."""
+    lines = [f"Inserted: {result['inserted']}"]
+    for title, items in (
+        ("Duplicates skipped", result["duplicates"]),
+        ("Invalid rows skipped", result["invalid"]),
+    ):
+        if items:
+            lines.append(f"{title}: {len(items)}")
+            lines.extend(f"  line {line_no}: {value}" for line_no, value in items[:limit])
+            if len(items) > limit:
+                lines.append(f"  … and {len(items) - limit} more")
+    return "\n".join(lines)
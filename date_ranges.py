@@ -0,0 +1,80 @@
+import datetime
+
+# Shift start times; each shift runs until the next one starts.
+SHIFTS = (
+    ("Shift A", datetime.time(6, 0)),
+    ("Shift B", datetime.time(14, 0)),
+    ("Shift C", datetime.time(22, 0)),
+)
+
+ALL = "All"
+RANGE_PRESETS = (
+    ALL,
+    "Current Shift",
+    "Last Shift",
+    "Today",
+    "Yesterday",
+    "This Week",
+    "Last 7 Days",
+    "Last 30 Days",
+)
+SHIFT_NAMES = (ALL,) + tuple(name for name, _ in SHIFTS)
+
+
+def _seconds(t):
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+
+def shift_window(name):
+    """Returns (start, end) seconds since midnight for a shift name, or None
+    for "All". end is exclusive and is smaller than start when the shift
+    crosses midnight."""
+    if not name or name == ALL:
+        return None
+    for i, (shift, start) in enumerate(SHIFTS):
+        if shift == name:
+            end = SHIFTS[(i + 1) % len(SHIFTS)][1]
+            return _seconds(start), _seconds(end)
+    raise ValueError(f"Unknown shift '{name}'")
+
+
+def _shift_starts(now):
+    """Shift start datetimes from the day before now to the day after, in order."""
+    starts = []
+    for days in (-1, 0, 1):
+        day = now.date() + datetime.timedelta(days=days)
+        starts.extend(datetime.datetime.combine(day, start) for _, start in SHIFTS)
+    return starts
+
+
+def resolve_range(preset, now=None):
+    """Returns (start, end) naive local datetimes for a preset; end is
+    exclusive and either bound may be None (open)."""
+    now = now or datetime.datetime.now()
+    today = datetime.datetime.combine(now.date(), datetime.time())
+    if not preset or preset == ALL:
+        return None, None
+    if preset in ("Current Shift", "Last Shift"):
+        starts = _shift_starts(now)
+        current = max(i for i, start in enumerate(starts) if start <= now)
+        if preset == "Current Shift":
+            return starts[current], None
+        return starts[current - 1], starts[current]
+    if preset == "Today":
+        return today, None
+    if preset == "Yesterday":
+        return today - datetime.timedelta(days=1), today
+    if preset == "This Week":
+        return today - datetime.timedelta(days=today.weekday()), None
+    if preset == "Last 7 Days":
+        return today - datetime.timedelta(days=6), None
+    if preset == "Last 30 Days":
+        return today - datetime.timedelta(days=29), None
+    raise ValueError(f"Unknown range '{preset}'")
+
+
+def date_filter(preset=ALL, shift=ALL, now=None):
+    """Returns the start/end/shift keyword arguments for the paged fetch,
+    count and export functions in db_handler."""
+    start, end = resolve_range(preset, now)
+    return {"start": start, "end": end, "shift": shift_window(shift)}
@@ -3,6 +3,16 @@ import os
 from datetime import datetime
 import sys
 import hashlib
+import threading
+import bisect
+import calendar
+import socket
+import time
+import atexit
+from contextlib import contextmanager
+from pathlib import Path
+
+import query_stats
 
 
 def resource_path(relative_path):
@@ -17,215 +27,1390 @@ def resource_path(relative_path):
 DB_NAME = "rework_data.db"
 SETUP_SQL_NAME = "setup.sql"
 
+# The user-facing columns, without the derived epoch columns.
+ENTRIES_COLUMNS = "sr_no, pcb_id, model, timestamp, rejection_stage, rejection_details"
+REWORK_LOG_COLUMNS = "id, pcb_id, rework_no, rework_action, rework_date, rework_done_by"
 
-def get_conn_and_cursor():
-    """Returns a connection and cursor for the database."""
-    try:
-        conn = sqlite3.connect(resource_path(DB_NAME))
-        return conn, conn.cursor()
-    except sqlite3.Error as e:
-        print(f"Database connection error: {e}")
-        return None, None
+# Connection tuning, applied once per connection when it is opened.
+BUSY_TIMEOUT_MS = 5000
+CACHE_SIZE_KIB = 16384
+MMAP_SIZE_BYTES = 64 * 1024 * 1024
+
+_db_path_override = None
+_writer = None
+_write_lock = threading.RLock()
+# (func, args) to call once the open write transaction commits; None outside
+# one. Guarded by _write_lock.
+_commit_hooks = None
+_reader_local = threading.local()
+_readers = []
+_readers_lock = threading.Lock()
+_generation = 0
+_initialized_path = None
 
 
 def get_db_path():
     """Get path for rework_data.db (always stored next to .exe or script)."""
+    if _db_path_override:
+        return _db_path_override
     if getattr(sys, "frozen", False):
         # Running as .exe → store DB in same folder as the exe
-        return os.path.join(os.path.dirname(sys.executable), "rework_data.db")
+        return os.path.join(os.path.dirname(sys.executable), DB_NAME)
     else:
         # Running as .py → store DB in current working directory
-        return os.path.join(os.path.abspath("."), "rework_data.db")
+        return os.path.join(os.path.abspath("."), DB_NAME)
+
+
+def set_db_path(db_path):
+    """Point db_handler at another database file (None restores the default).
+
+    Open connections are closed so the next call reconnects to the new file.
+    """
+    global _db_path_override
+    close_connections()
+    _db_path_override = os.path.abspath(db_path) if db_path else None
+
+
+def _open_connection(db_path):
+    """Opens a connection in autocommit mode with the per-connection pragmas."""
+    conn = sqlite3.connect(
+        db_path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        isolation_level=None,
+        check_same_thread=False,
+        factory=query_stats.connection_factory(),
+    )
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KIB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE_BYTES}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+
+def _get_writer():
+    """Returns the process-wide writer connection, opening it on first use."""
+    global _writer
+    with _write_lock:
+        if _writer is None:
+            _writer = _open_connection(get_db_path())
+            # WAL is persistent in the file; readers no longer block the writer.
+            _writer.execute("PRAGMA journal_mode = WAL")
+        return _writer
+
+
+def _get_reader():
+    """Returns this thread's reader connection, opening it on first use."""
+    conn = getattr(_reader_local, "conn", None)
+    if conn is None or getattr(_reader_local, "generation", None) != _generation:
+        _get_writer()  # make sure the file is in WAL mode first
+        conn = _open_connection(get_db_path())
+        conn.execute("PRAGMA query_only = ON")
+        _reader_local.conn = conn
+        _reader_local.generation = _generation
+        with _readers_lock:
+            _readers.append(conn)
+    return conn
+
 
+def _read_cursor():
+    return _get_reader().cursor()
 
-def get_conn_and_cursor():
-    conn = sqlite3.connect(get_db_path())
-    return conn, conn.cursor()
+
+@contextmanager
+def write_transaction():
+    """Yields a cursor on the writer inside one BEGIN IMMEDIATE ... COMMIT.
+
+    Nested use on the same thread joins the outer transaction, so helpers
+    can be composed into a single commit. Hooks added with _after_commit run
+    after the outermost commit, and are dropped on rollback.
+    """
+    global _commit_hooks
+    with _write_lock:
+        conn = _get_writer()
+        cur = conn.cursor()
+        if conn.in_transaction:
+            yield cur
+            return
+        cur.execute("BEGIN IMMEDIATE")
+        _commit_hooks = []
+        try:
+            yield cur
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            cur.close()
+            hooks, _commit_hooks = _commit_hooks, None
+        for func, args in hooks:
+            func(*args)
+
+
+def _after_commit(func, *args):
+    """Calls func(*args) once the write transaction open on this thread
+    commits, or straight away if there is none."""
+    with _write_lock:
+        if _commit_hooks is not None:
+            _commit_hooks.append((func, args))
+            return
+    func(*args)
+
+
+def close_connections():
+    """Closes the writer and every reader connection."""
+    global _writer, _generation, _initialized_path
+    with _write_lock:
+        _initialized_path = None
+        _invalidate_models_cache()
+        _drop_pcb_index()
+        with _readers_lock:
+            for conn in _readers:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            _readers.clear()
+            _generation += 1
+        if _writer is not None:
+            try:
+                # Refreshes planner statistics; cheap, and kept off the startup path.
+                _writer.execute("PRAGMA optimize")
+                _writer.close()
+            except sqlite3.Error:
+                pass
+            _writer = None
+
+
+atexit.register(close_connections)
 
 
 def get_connection():
-    db_path = get_db_path()
-    conn = sqlite3.connect(db_path)
+    """Returns this thread's shared read connection (do not close it)."""
+    return _get_reader()
+
+
+# ---------- Schema migrations ----------
+# setup.sql is schema version 0. Each migration is (version, steps) where a
+# step is an SQL statement or a callable taking the write cursor. Steps of one
+# migration run in a single transaction together with the user_version bump,
+# so an interrupted upgrade leaves the file at the previous version.
+# json_object() payloads queued in sync_outbox, formatted with the row alias.
+_OUTBOX_ENTRY_JSON = (
+    "json_object('sr_no', {row}.sr_no, 'pcb_id', {row}.pcb_id, "
+    "'model', {row}.model, 'timestamp', {row}.timestamp, "
+    "'rejection_stage', {row}.rejection_stage, "
+    "'rejection_details', {row}.rejection_details, 'ts_epoch', {row}.ts_epoch)"
+)
+_OUTBOX_REWORK_JSON = (
+    "json_object('id', {row}.id, 'pcb_id', {row}.pcb_id, "
+    "'rework_no', {row}.rework_no, 'rework_action', {row}.rework_action, "
+    "'rework_date', {row}.rework_date, 'rework_done_by', {row}.rework_done_by, "
+    "'rework_epoch', {row}.rework_epoch)"
+)
+
+MIGRATIONS = [
+    (
+        1,
+        [
+            "CREATE INDEX IF NOT EXISTS idx_rework_log_pcb_id_rework_no "
+            "ON rework_log (pcb_id, rework_no)",
+            "CREATE INDEX IF NOT EXISTS idx_rework_log_rework_date "
+            "ON rework_log (rework_date)",
+            "CREATE INDEX IF NOT EXISTS idx_entries_timestamp ON entries (timestamp)",
+        ],
+    ),
+    (
+        2,
+        [
+            lambda cur: _renumber_duplicate_reworks(cur),
+            "DROP INDEX IF EXISTS idx_rework_log_pcb_id_rework_no",
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_rework_log_pcb_id_rework_no "
+            "ON rework_log (pcb_id, rework_no)",
+            """
+            CREATE TABLE IF NOT EXISTS rework_counters (
+                pcb_id TEXT PRIMARY KEY,
+                last_rework_no INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """,
+            """
+            INSERT OR REPLACE INTO rework_counters (pcb_id, last_rework_no)
+            SELECT pcb_id, MAX(rework_no) FROM rework_log GROUP BY pcb_id
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_rework_log_counter
+            AFTER INSERT ON rework_log
+            BEGIN
+                INSERT INTO rework_counters (pcb_id, last_rework_no)
+                VALUES (NEW.pcb_id, NEW.rework_no)
+                ON CONFLICT (pcb_id) DO UPDATE
+                SET last_rework_no = MAX(last_rework_no, excluded.last_rework_no);
+            END
+            """,
+        ],
+    ),
+    (
+        3,
+        [
+            # Full-text indexes over the free-text columns. Both are external
+            # content tables, so the text is stored once, in the base table.
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS rework_fts USING fts5 (
+                pcb_id, rework_action,
+                content='rework_log', content_rowid='id',
+                prefix='2 3'
+            )
+            """,
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5 (
+                pcb_id, rejection_stage, rejection_details,
+                content='entries', content_rowid='sr_no',
+                prefix='2 3'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_rework_fts_insert
+            AFTER INSERT ON rework_log
+            BEGIN
+                INSERT INTO rework_fts (rowid, pcb_id, rework_action)
+                VALUES (NEW.id, NEW.pcb_id, NEW.rework_action);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_rework_fts_delete
+            AFTER DELETE ON rework_log
+            BEGIN
+                INSERT INTO rework_fts (rework_fts, rowid, pcb_id, rework_action)
+                VALUES ('delete', OLD.id, OLD.pcb_id, OLD.rework_action);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_rework_fts_update
+            AFTER UPDATE ON rework_log
+            BEGIN
+                INSERT INTO rework_fts (rework_fts, rowid, pcb_id, rework_action)
+                VALUES ('delete', OLD.id, OLD.pcb_id, OLD.rework_action);
+                INSERT INTO rework_fts (rowid, pcb_id, rework_action)
+                VALUES (NEW.id, NEW.pcb_id, NEW.rework_action);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_entries_fts_insert
+            AFTER INSERT ON entries
+            BEGIN
+                INSERT INTO entries_fts (rowid, pcb_id, rejection_stage, rejection_details)
+                VALUES (NEW.sr_no, NEW.pcb_id, NEW.rejection_stage, NEW.rejection_details);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_entries_fts_delete
+            AFTER DELETE ON entries
+            BEGIN
+                INSERT INTO entries_fts
+                    (entries_fts, rowid, pcb_id, rejection_stage, rejection_details)
+                VALUES ('delete', OLD.sr_no, OLD.pcb_id, OLD.rejection_stage,
+                        OLD.rejection_details);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_entries_fts_update
+            AFTER UPDATE ON entries
+            BEGIN
+                INSERT INTO entries_fts
+                    (entries_fts, rowid, pcb_id, rejection_stage, rejection_details)
+                VALUES ('delete', OLD.sr_no, OLD.pcb_id, OLD.rejection_stage,
+                        OLD.rejection_details);
+                INSERT INTO entries_fts (rowid, pcb_id, rejection_stage, rejection_details)
+                VALUES (NEW.sr_no, NEW.pcb_id, NEW.rejection_stage, NEW.rejection_details);
+            END
+            """,
+            "INSERT INTO rework_fts (rework_fts) VALUES ('rebuild')",
+            "INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')",
+        ],
+    ),
+    (
+        4,
+        [
+            # Defect counts per day x model x stage x reason, bumped by a
+            # trigger as entries are added. Entries are deleted once reworked,
+            # so the rollup is the lasting record; the backfill can only count
+            # the entries still present.
+            """
+            CREATE TABLE IF NOT EXISTS defect_rollup (
+                day TEXT NOT NULL,
+                model TEXT NOT NULL,
+                rejection_stage TEXT NOT NULL,
+                rejection_details TEXT NOT NULL,
+                defects INTEGER NOT NULL,
+                PRIMARY KEY (day, model, rejection_stage, rejection_details)
+            ) WITHOUT ROWID
+            """,
+            """
+            INSERT OR REPLACE INTO defect_rollup
+                (day, model, rejection_stage, rejection_details, defects)
+            SELECT substr(timestamp, 1, 10), model,
+                   COALESCE(rejection_stage, ''), COALESCE(rejection_details, ''),
+                   COUNT(*)
+            FROM entries
+            GROUP BY 1, 2, 3, 4
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_defect_rollup_insert
+            AFTER INSERT ON entries
+            BEGIN
+                INSERT INTO defect_rollup
+                    (day, model, rejection_stage, rejection_details, defects)
+                VALUES (substr(NEW.timestamp, 1, 10), NEW.model,
+                        COALESCE(NEW.rejection_stage, ''),
+                        COALESCE(NEW.rejection_details, ''), 1)
+                ON CONFLICT (day, model, rejection_stage, rejection_details)
+                DO UPDATE SET defects = defects + 1;
+            END
+            """,
+        ],
+    ),
+    (
+        5,
+        [
+            # Model of every board ever entered; rework_log has no model and
+            # entries are deleted once reworked.
+            """
+            CREATE TABLE IF NOT EXISTS pcb_models (
+                pcb_id TEXT PRIMARY KEY,
+                model TEXT NOT NULL
+            ) WITHOUT ROWID
+            """,
+            "INSERT OR REPLACE INTO pcb_models (pcb_id, model) "
+            "SELECT pcb_id, model FROM entries",
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_pcb_models_insert
+            AFTER INSERT ON entries
+            BEGIN
+                INSERT OR REPLACE INTO pcb_models (pcb_id, model)
+                VALUES (NEW.pcb_id, NEW.model);
+            END
+            """,
+            # Daily KPI summary. rejected is bumped by a trigger; the rework
+            # columns are folded in by refresh_kpi_daily from the rework_log id
+            # high-water mark kept in kpi_state.
+            """
+            CREATE TABLE IF NOT EXISTS kpi_daily (
+                day TEXT NOT NULL,
+                model TEXT NOT NULL,
+                rejected INTEGER NOT NULL DEFAULT 0,
+                reworked INTEGER NOT NULL DEFAULT 0,
+                reworked_multi INTEGER NOT NULL DEFAULT 0,
+                rework_actions INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, model)
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS kpi_state (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            ) WITHOUT ROWID
+            """,
+            "INSERT OR IGNORE INTO kpi_state (name, value) VALUES ('rework_log_id', 0)",
+            """
+            INSERT OR REPLACE INTO kpi_daily (day, model, rejected)
+            SELECT day, model, SUM(defects) FROM defect_rollup GROUP BY day, model
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_kpi_daily_rejected
+            AFTER INSERT ON entries
+            BEGIN
+                INSERT INTO kpi_daily (day, model, rejected)
+                VALUES (substr(NEW.timestamp, 1, 10), NEW.model, 1)
+                ON CONFLICT (day, model) DO UPDATE SET rejected = rejected + 1;
+            END
+            """,
+        ],
+    ),
+    (
+        6,
+        [
+            # Numeric copies of the TEXT timestamps (seconds of the local wall
+            # clock, as strftime('%s') reads them) so date ranges and shifts
+            # are integer index seeks; they replace the TEXT indexes from v1.
+            "ALTER TABLE entries ADD COLUMN ts_epoch INTEGER",
+            "ALTER TABLE rework_log ADD COLUMN rework_epoch INTEGER",
+            # Only text changes need to reach the FTS tables; recreate the
+            # update triggers with column lists before the backfill.
+            "DROP TRIGGER IF EXISTS trg_rework_fts_update",
+            """
+            CREATE TRIGGER trg_rework_fts_update
+            AFTER UPDATE OF pcb_id, rework_action ON rework_log
+            BEGIN
+                INSERT INTO rework_fts (rework_fts, rowid, pcb_id, rework_action)
+                VALUES ('delete', OLD.id, OLD.pcb_id, OLD.rework_action);
+                INSERT INTO rework_fts (rowid, pcb_id, rework_action)
+                VALUES (NEW.id, NEW.pcb_id, NEW.rework_action);
+            END
+            """,
+            "DROP TRIGGER IF EXISTS trg_entries_fts_update",
+            """
+            CREATE TRIGGER trg_entries_fts_update
+            AFTER UPDATE OF pcb_id, rejection_stage, rejection_details ON entries
+            BEGIN
+                INSERT INTO entries_fts
+                    (entries_fts, rowid, pcb_id, rejection_stage, rejection_details)
+                VALUES ('delete', OLD.sr_no, OLD.pcb_id, OLD.rejection_stage,
+                        OLD.rejection_details);
+                INSERT INTO entries_fts (rowid, pcb_id, rejection_stage, rejection_details)
+                VALUES (NEW.sr_no, NEW.pcb_id, NEW.rejection_stage, NEW.rejection_details);
+            END
+            """,
+            "UPDATE entries SET ts_epoch = CAST(strftime('%s', timestamp) AS INTEGER)",
+            "UPDATE rework_log "
+            "SET rework_epoch = CAST(strftime('%s', rework_date) AS INTEGER)",
+            "DROP INDEX IF EXISTS idx_entries_timestamp",
+            "DROP INDEX IF EXISTS idx_rework_log_rework_date",
+            "CREATE INDEX IF NOT EXISTS idx_entries_ts_epoch ON entries (ts_epoch)",
+            "CREATE INDEX IF NOT EXISTS idx_rework_log_rework_epoch "
+            "ON rework_log (rework_epoch)",
+        ],
+    ),
+    (
+        7,
+        [
+            # Which monthly archive files hold rows for a PCB (see
+            # archive_old_rows), so lookups attach only those files.
+            """
+            CREATE TABLE IF NOT EXISTS archive_index (
+                pcb_id TEXT NOT NULL,
+                month TEXT NOT NULL,
+                PRIMARY KEY (pcb_id, month)
+            ) WITHOUT ROWID
+            """,
+        ],
+    ),
+    (
+        8,
+        [
+            # Multi-station sync (see sync.py). Once a station is registered
+            # for sync (enable_sync_outbox) it appends every new entry and
+            # rework to sync_outbox; a central database records how far it
+            # has merged each station and any conflicts. The outbox starts
+            # off, so a database that never syncs does not keep a copy.
+            """
+            CREATE TABLE IF NOT EXISTS sync_info (
+                name TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            ) WITHOUT ROWID
+            """,
+            lambda cur: _init_sync_info(cur),
+            """
+            CREATE TABLE IF NOT EXISTS sync_outbox (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                payload TEXT NOT NULL
+            )
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_sync_outbox_entries
+            AFTER INSERT ON entries
+            WHEN (SELECT value FROM sync_info WHERE name = 'outbox') = 'on'
+            BEGIN
+                INSERT INTO sync_outbox (table_name, payload)
+                VALUES ('entries', {_OUTBOX_ENTRY_JSON.format(row="NEW")});
+            END
+            """,
+            f"""
+            CREATE TRIGGER IF NOT EXISTS trg_sync_outbox_rework_log
+            AFTER INSERT ON rework_log
+            WHEN (SELECT value FROM sync_info WHERE name = 'outbox') = 'on'
+            BEGIN
+                INSERT INTO sync_outbox (table_name, payload)
+                VALUES ('rework_log', {_OUTBOX_REWORK_JSON.format(row="NEW")});
+            END
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS sync_stations (
+                station_id TEXT PRIMARY KEY,
+                last_seq INTEGER NOT NULL,
+                last_sync TEXT NOT NULL
+            ) WITHOUT ROWID
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS sync_conflicts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                station_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                pcb_id TEXT NOT NULL,
+                detail TEXT NOT NULL,
+                logged_at TEXT NOT NULL
+            )
+            """,
+        ],
+    ),
+    (
+        9,
+        [
+            # reworked_multi counted second reworks on the day they were done;
+            # it now counts them against the board's first rework day, the
+            # same boards as reworked.
+            lambda cur: _recount_repeat_reworks(cur),
+        ],
+    ),
+    (
+        10,
+        [
+            # entries only holds pending boards, so entries_fts lost a board's
+            # rejection text as soon as it was reworked. rejection_history
+            # keeps a copy of every rejection (filled by trigger) and is what
+            # search_history now indexes. Rejections of boards reworked before
+            # this migration are already gone and cannot be recovered.
+            """
+            CREATE TABLE IF NOT EXISTS rejection_history (
+                sr_no INTEGER PRIMARY KEY,
+                pcb_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                rejection_stage TEXT,
+                rejection_details TEXT
+            )
+            """,
+            """
+            INSERT OR IGNORE INTO rejection_history
+                (sr_no, pcb_id, timestamp, rejection_stage, rejection_details)
+            SELECT sr_no, pcb_id, timestamp, rejection_stage, rejection_details
+            FROM entries
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_rejection_history_insert
+            AFTER INSERT ON entries
+            BEGIN
+                INSERT OR REPLACE INTO rejection_history
+                    (sr_no, pcb_id, timestamp, rejection_stage, rejection_details)
+                VALUES (NEW.sr_no, NEW.pcb_id, NEW.timestamp, NEW.rejection_stage,
+                        NEW.rejection_details);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_rejection_history_update
+            AFTER UPDATE OF pcb_id, timestamp, rejection_stage, rejection_details
+            ON entries
+            BEGIN
+                UPDATE rejection_history
+                SET pcb_id = NEW.pcb_id, timestamp = NEW.timestamp,
+                    rejection_stage = NEW.rejection_stage,
+                    rejection_details = NEW.rejection_details
+                WHERE sr_no = NEW.sr_no;
+            END
+            """,
+            "DROP TRIGGER IF EXISTS trg_entries_fts_insert",
+            "DROP TRIGGER IF EXISTS trg_entries_fts_delete",
+            "DROP TRIGGER IF EXISTS trg_entries_fts_update",
+            "DROP TABLE IF EXISTS entries_fts",
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS rejection_fts USING fts5 (
+                pcb_id, rejection_stage, rejection_details,
+                content='rejection_history', content_rowid='sr_no',
+                prefix='2 3'
+            )
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_rejection_fts_insert
+            AFTER INSERT ON rejection_history
+            BEGIN
+                INSERT INTO rejection_fts
+                    (rowid, pcb_id, rejection_stage, rejection_details)
+                VALUES (NEW.sr_no, NEW.pcb_id, NEW.rejection_stage,
+                        NEW.rejection_details);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_rejection_fts_delete
+            AFTER DELETE ON rejection_history
+            BEGIN
+                INSERT INTO rejection_fts
+                    (rejection_fts, rowid, pcb_id, rejection_stage, rejection_details)
+                VALUES ('delete', OLD.sr_no, OLD.pcb_id, OLD.rejection_stage,
+                        OLD.rejection_details);
+            END
+            """,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_rejection_fts_update
+            AFTER UPDATE OF pcb_id, rejection_stage, rejection_details
+            ON rejection_history
+            BEGIN
+                INSERT INTO rejection_fts
+                    (rejection_fts, rowid, pcb_id, rejection_stage, rejection_details)
+                VALUES ('delete', OLD.sr_no, OLD.pcb_id, OLD.rejection_stage,
+                        OLD.rejection_details);
+                INSERT INTO rejection_fts
+                    (rowid, pcb_id, rejection_stage, rejection_details)
+                VALUES (NEW.sr_no, NEW.pcb_id, NEW.rejection_stage,
+                        NEW.rejection_details);
+            END
+            """,
+            "INSERT INTO rejection_fts (rejection_fts) VALUES ('rebuild')",
+        ],
+    ),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def _init_sync_info(cur):
+    """Names this database's station for sync (host name plus a random
+    suffix, so copies on one machine stay distinct), with the outbox off."""
+    station_id = f"{socket.gethostname()}-{os.urandom(3).hex()}"
+    cur.executemany(
+        "INSERT OR IGNORE INTO sync_info (name, value) VALUES (?, ?)",
+        [("station_id", station_id), ("outbox", "off")],
+    )
+
+
+def enable_sync_outbox(cur):
+    """Registers the database as a sync station: turns the outbox on and, the
+    first time, queues the existing history oldest first. Returns True if the
+    outbox was off."""
+    cur.execute("SELECT value FROM sync_info WHERE name = 'outbox'")
+    if cur.fetchone()[0] == "on":
+        return False
+    cur.execute("UPDATE sync_info SET value = 'on' WHERE name = 'outbox'")
+    cur.execute(
+        f"""
+        INSERT INTO sync_outbox (table_name, payload)
+        SELECT table_name, payload FROM (
+            SELECT 'entries' AS table_name, ts_epoch AS epoch, sr_no AS key,
+                   {_OUTBOX_ENTRY_JSON.format(row="entries")} AS payload
+            FROM entries
+            UNION ALL
+            SELECT 'rework_log', rework_epoch, id,
+                   {_OUTBOX_REWORK_JSON.format(row="rework_log")}
+            FROM rework_log
+        )
+        ORDER BY epoch, table_name, key
+        """
+    )
+    return True
+
+
+def _renumber_duplicate_reworks(cur):
+    """Renumbers PCBs whose history has repeated rework_no values (written by
+    racing stations before numbering was atomic) to 1..n in id order."""
+    cur.execute(
+        """
+        SELECT DISTINCT pcb_id FROM rework_log
+        GROUP BY pcb_id, rework_no HAVING COUNT(*) > 1
+        """
+    )
+    for (pcb_id,) in cur.fetchall():
+        cur.execute(
+            "SELECT id FROM rework_log WHERE pcb_id = ? ORDER BY rework_no, id",
+            (pcb_id,),
+        )
+        ids = [row[0] for row in cur.fetchall()]
+        cur.executemany(
+            "UPDATE rework_log SET rework_no = ? WHERE id = ?",
+            [(n, row_id) for n, row_id in enumerate(ids, start=1)],
+        )
+
+
+def get_schema_version():
+    """Returns the PRAGMA user_version of the database."""
+    cur = _read_cursor()
+    cur.execute("PRAGMA user_version")
+    return cur.fetchone()[0]
+
+
+def _run_migrations(conn):
+    """Applies each pending migration with its user_version bump in one
+    transaction on conn."""
+    for version, steps in MIGRATIONS:
+        cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        try:
+            cur.execute("PRAGMA user_version")
+            if cur.fetchone()[0] < version:
+                for step in steps:
+                    if callable(step):
+                        step(cur)
+                    else:
+                        cur.execute(step)
+                cur.execute(f"PRAGMA user_version = {version}")
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            cur.close()
+
+
+def migrate_db():
+    """Upgrades the database in place to SCHEMA_VERSION."""
+    with _write_lock:
+        _run_migrations(_get_writer())
+
+
+def _read_setup_sql():
+    # setup.sql is bundled inside exe → extract correct path
+    if getattr(sys, "frozen", False):
+        base_path = sys._MEIPASS
+    else:
+        base_path = os.path.dirname(os.path.abspath(__file__))
+
+    sql_file = os.path.join(base_path, SETUP_SQL_NAME)
+
+    with open(sql_file, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def open_database(db_path):
+    """Opens a connection to another rework database file, such as a station
+    or central database being synced, creating and migrating it as needed.
+
+    The caller owns the connection and must close it.
+    """
+    is_new = not os.path.exists(db_path)
+    conn = _open_connection(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        if is_new:
+            conn.executescript(_read_setup_sql())
+        _run_migrations(conn)
+    except BaseException:
+        conn.close()
+        raise
     return conn
 
 
 def init_db():
+    """Creates and/or migrates the database. Cheap after the first call for a path."""
+    global _initialized_path
     db_path = get_db_path()
+    if _initialized_path == db_path:
+        return
     if not os.path.exists(db_path):
         # First run → create db from setup.sql
         try:
-            # setup.sql is bundled inside exe → extract correct path
-            if getattr(sys, "frozen", False):
-                base_path = sys._MEIPASS
-            else:
-                base_path = os.path.dirname(os.path.abspath(__file__))
+            sql_script = _read_setup_sql()
+            conn = _get_writer()
+            with _write_lock:
+                conn.executescript(sql_script)
+        except Exception as e:
+            print(f"DB Init Error: {e}", file=sys.stderr)
 
-            sql_file = os.path.join(base_path, "setup.sql")
+    try:
+        if get_schema_version() < SCHEMA_VERSION:
+            migrate_db()
+        _initialized_path = db_path
+    except Exception as e:
+        print(f"DB Migration Error: {e}", file=sys.stderr)
 
-            with open(sql_file, "r", encoding="utf-8") as f:
-                sql_script = f.read()
 
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            cursor.executescript(sql_script)
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            print(f"DB Init Error: {e}")
+def get_rework_log_by_pcbid(pcb_id):
+    """Returns the PCB's first rework (lowest rework_no), archived or not."""
+    sql = (
+        f"SELECT {REWORK_LOG_COLUMNS} FROM {{db}}.rework_log "
+        "WHERE pcb_id = ? ORDER BY rework_no LIMIT 1"
+    )
+    cursor = _read_cursor()
+    cursor.execute(sql.format(db="main"), (pcb_id,))
+    rows = cursor.fetchall() + _archived_rows(pcb_id, sql)
+    # Each row is (id, pcb_id, rework_no, ...).
+    return min(rows, key=lambda row: row[2]) if rows else None
 
 
-def get_rework_log_by_pcbid(pcb_id):
-    conn, cursor = get_conn_and_cursor()
-    if not conn:
-        return None
-    cursor.execute("SELECT * FROM rework_log WHERE pcb_id=?", (pcb_id,))
-    result = cursor.fetchone()
-    conn.close()
-    return result
+# Model names change rarely, so the list is cached for a short while; models
+# added at this station invalidate it immediately.
+MODELS_CACHE_SECONDS = 60
+_models_cache = None
+
+
+def _invalidate_models_cache():
+    global _models_cache
+    _models_cache = None
 
 
 def insert_model(model_name):
     """Inserts a new model into the database."""
-    conn, cur = get_conn_and_cursor()
-    if not conn:
-        return False, "Database connection failed."
-
     try:
-        cur.execute("INSERT INTO models (model_name) VALUES (?)", (model_name,))
-        conn.commit()
+        with write_transaction() as cur:
+            cur.execute("INSERT INTO models (model_name) VALUES (?)", (model_name,))
+        _invalidate_models_cache()
         return True, "Model added successfully"
     except sqlite3.IntegrityError:
         return False, "Model already exists."
     except Exception as e:
         return False, f"Database Error: {e}"
-    finally:
-        conn.close()
 
 
 def get_all_models():
-    """Fetches all model names from the database."""
-    conn, cur = get_conn_and_cursor()
-    if not conn:
-        return []
-
+    """Fetches all model names from the database (cached, see MODELS_CACHE_SECONDS)."""
+    global _models_cache
+    if _models_cache and time.monotonic() - _models_cache[0] < MODELS_CACHE_SECONDS:
+        return list(_models_cache[1])
     try:
+        cur = _read_cursor()
         cur.execute("SELECT model_name FROM models")
-        return cur.fetchall()
+        rows = cur.fetchall()
+        _models_cache = (time.monotonic(), rows)
+        return list(rows)
     except Exception as e:
         print(f"Error fetching models: {e}")
         return []
-    finally:
-        conn.close()
+
+
+# ---------- PCB ID prefix index ----------
+# A sorted in-memory list of every known PCB ID (pending entries and reworked
+# boards) for autocomplete. Loaded once, then kept current by this station's
+# write path; refresh_pcb_index picks up other stations' boards.
+_pcb_ids = None
+_pcb_ids_loaded_at = 0.0
+_pcb_ids_lock = threading.Lock()
+
+
+def _drop_pcb_index():
+    global _pcb_ids
+    with _pcb_ids_lock:
+        _pcb_ids = None
+
+
+def refresh_pcb_index():
+    """(Re)loads the PCB ID index from the database; returns its size."""
+    global _pcb_ids, _pcb_ids_loaded_at
+    cur = _read_cursor()
+    cur.execute(
+        "SELECT pcb_id FROM entries UNION SELECT pcb_id FROM rework_counters"
+    )
+    ids = [row[0] for row in cur.fetchall()]
+    ids.sort()
+    with _pcb_ids_lock:
+        _pcb_ids = ids
+        _pcb_ids_loaded_at = time.monotonic()
+    return len(ids)
+
+
+def pcb_index_age():
+    """Seconds since the index was loaded, or None if it never was."""
+    if _pcb_ids is None:
+        return None
+    return time.monotonic() - _pcb_ids_loaded_at
+
+
+def _pcb_index_add(pcb_ids):
+    with _pcb_ids_lock:
+        if _pcb_ids is None:
+            return
+        if len(pcb_ids) > 64:
+            # Timsort merges the appended run in roughly linear time.
+            _pcb_ids.extend(pcb_ids)
+            _pcb_ids.sort()
+            _pcb_ids[:] = [
+                pcb_id
+                for i, pcb_id in enumerate(_pcb_ids)
+                if i == 0 or pcb_id != _pcb_ids[i - 1]
+            ]
+            return
+        for pcb_id in pcb_ids:
+            i = bisect.bisect_left(_pcb_ids, pcb_id)
+            if i == len(_pcb_ids) or _pcb_ids[i] != pcb_id:
+                _pcb_ids.insert(i, pcb_id)
+
+
+def complete_pcb_id(prefix, limit=10):
+    """Returns up to limit known PCB IDs starting with prefix, in order.
+
+    Returns None while the index has not been loaded.
+    """
+    with _pcb_ids_lock:
+        if _pcb_ids is None:
+            return None
+        i = bisect.bisect_left(_pcb_ids, prefix)
+        matches = []
+        while i < len(_pcb_ids) and len(matches) < limit:
+            if not _pcb_ids[i].startswith(prefix):
+                break
+            matches.append(_pcb_ids[i])
+            i += 1
+        return matches
+
+
+def is_known_pcb_id(pcb_id):
+    """True/False from the index, or None while it has not been loaded."""
+    with _pcb_ids_lock:
+        if _pcb_ids is None:
+            return None
+        i = bisect.bisect_left(_pcb_ids, pcb_id)
+        return i < len(_pcb_ids) and _pcb_ids[i] == pcb_id
 
 
 def insert_entry(pcb_id, model, timestamp, rejection_stage, rejection_details):
     """Inserts a new entry into the database."""
-    conn, cur = get_conn_and_cursor()
-    if not conn:
-        return False
-
-    try:
+    with write_transaction() as cur:
         cur.execute(
             """
-            INSERT INTO entries (pcb_id, model, timestamp, rejection_stage, rejection_details)
-            VALUES (?, ?, ?, ?, ?)
+            INSERT INTO entries
+                (pcb_id, model, timestamp, rejection_stage, rejection_details, ts_epoch)
+            VALUES (?1, ?2, ?3, ?4, ?5, CAST(strftime('%s', ?3) AS INTEGER))
             """,
             (pcb_id, model, timestamp, rejection_stage, rejection_details),
         )
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        raise
-    except Exception as e:
-        raise
-    finally:
-        conn.close()
+        _after_commit(_pcb_index_add, [pcb_id])
+    return True
+
+
+IMPORT_BATCH_SIZE = 5000
+
+# SQLite's default limit on host parameters is 999 on older builds.
+_MAX_IN_PARAMS = 900
+
+
+def insert_entries_bulk(records, batch_size=IMPORT_BATCH_SIZE):
+    """Inserts many entries, committing once per batch of batch_size rows.
+
+    records yields (line_no, pcb_id, model, timestamp, rejection_stage,
+    rejection_details), timestamp as "YYYY-MM-DD HH:MM:SS". Rows with a
+    missing field, a malformed timestamp or a model that is not in the models
+    table, and PCB IDs that already exist or repeat within the input, are
+    skipped and reported rather than aborting the import.
+
+    Returns {"inserted": n, "duplicates": [(line_no, pcb_id)],
+    "invalid": [(line_no, reason)]}.
+    """
+    models = {row[0] for row in get_all_models()}
+    result = {"inserted": 0, "duplicates": [], "invalid": []}
+    seen = set()
+    batch = []
+
+    for line_no, pcb_id, model, timestamp, stage, details in records:
+        pcb_id = (pcb_id or "").strip()
+        model = (model or "").strip()
+        if not pcb_id:
+            result["invalid"].append((line_no, "PCB ID is empty"))
+        elif model not in models:
+            result["invalid"].append((line_no, f"Unknown model '{model}'"))
+        elif not stage or not details:
+            result["invalid"].append((line_no, "Rejection stage/details missing"))
+        elif not _is_timestamp(timestamp):
+            result["invalid"].append((line_no, f"Unrecognised timestamp '{timestamp}'"))
+        elif pcb_id in seen:
+            result["duplicates"].append((line_no, pcb_id))
+        else:
+            seen.add(pcb_id)
+            batch.append((line_no, pcb_id, model, timestamp, stage, details))
+            if len(batch) >= batch_size:
+                _insert_entries_batch(batch, result)
+                batch = []
+    if batch:
+        _insert_entries_batch(batch, result)
+    return result
+
+
+def _is_timestamp(value):
+    try:
+        datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _insert_entries_batch(batch, result):
+    with write_transaction() as cur:
+        existing = set()
+        for start in range(0, len(batch), _MAX_IN_PARAMS):
+            ids = [row[1] for row in batch[start : start + _MAX_IN_PARAMS]]
+            cur.execute(
+                f"SELECT pcb_id FROM entries WHERE pcb_id IN ({','.join('?' * len(ids))})",
+                ids,
+            )
+            existing.update(row[0] for row in cur.fetchall())
+
+        new_rows = []
+        for line_no, *row in batch:
+            if row[0] in existing:
+                result["duplicates"].append((line_no, row[0]))
+            else:
+                new_rows.append(row)
+        cur.executemany(
+            """
+            INSERT INTO entries
+                (pcb_id, model, timestamp, rejection_stage, rejection_details, ts_epoch)
+            VALUES (?1, ?2, ?3, ?4, ?5, CAST(strftime('%s', ?3) AS INTEGER))
+            """,
+            new_rows,
+        )
+        result["inserted"] += len(new_rows)
+        _after_commit(_pcb_index_add, [row[0] for row in new_rows])
 
 
 def search_entry_by_pcbid(pcbid):
     """Searches for a single entry by its PCB ID."""
-    conn, cur = get_conn_and_cursor()
-    if not conn:
-        return []
-
     try:
-        cur.execute("SELECT * FROM entries WHERE pcb_id = ?", (pcbid,))
-        rows = cur.fetchall()
-        return rows
+        cur = _read_cursor()
+        cur.execute(f"SELECT {ENTRIES_COLUMNS} FROM entries WHERE pcb_id = ?", (pcbid,))
+        return cur.fetchall()
     except Exception as e:
         print(f"Error searching entry by PCB ID: {e}")
         return []
-    finally:
-        conn.close()
 
 
 def delete_entry_by_pcb_id(pcbid):
-    conn, cur = get_conn_and_cursor()
-    if not conn:
-        return False
-    cur.execute("DELETE FROM entries WHERE pcb_id = ?", (pcbid,))
-    conn.commit()
-    conn.close()
+    with write_transaction() as cur:
+        # A deleted entry was a mistake, so unlike a reworked one it also
+        # leaves the rejection history.
+        cur.execute(
+            "DELETE FROM rejection_history WHERE sr_no IN "
+            "(SELECT sr_no FROM entries WHERE pcb_id = ?)",
+            (pcbid,),
+        )
+        cur.execute("DELETE FROM entries WHERE pcb_id = ?", (pcbid,))
     return True
 
 
 def get_all_reworks_by_pcbid(pcbid):
     """Fetches all rework logs for a specific PCB ID."""
-    conn, cur = get_conn_and_cursor()
-    if not conn:
-        return []
     try:
+        cur = _read_cursor()
         cur.execute(
-            "SELECT rework_no, rework_action, rework_date, rework_done_by FROM rework_log WHERE pcb_id=?",
+            "SELECT rework_no, rework_action, rework_date, rework_done_by FROM rework_log WHERE pcb_id=? ORDER BY rework_no",
             (pcbid,),
         )
-        return cur.fetchall()
+        return _with_archived_reworks(pcbid, cur.fetchall())
     except Exception as e:
         print(f"Error fetching reworks for PCB ID: {e}")
         return []
-    finally:
-        conn.close()
 
 
 def get_rework_count(pcbid):
     """Returns the number of reworks for a given PCB ID."""
-    conn, cur = get_conn_and_cursor()
-    if not conn:
-        return 0
-
     try:
+        cur = _read_cursor()
         cur.execute("SELECT COUNT(*) FROM rework_log WHERE pcb_id = ?", (pcbid,))
         count = cur.fetchone()[0]
-        return count
+        archived = _archived_rows(
+            pcbid, "SELECT COUNT(*) FROM {db}.rework_log WHERE pcb_id = ?"
+        )
+        return count + sum(row[0] for row in archived)
     except Exception as e:
         print(f"Error getting rework count: {e}")
         return 0
-    finally:
-        conn.close()
 
 
 def insert_rework(pcbid, reason, operator):
-    conn, cursor = get_conn_and_cursor()
-    if not conn:
-        return
-    rework_no = get_rework_count(pcbid) + 1
-    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    """Logs a rework and returns its rework_no.
+
+    The number is taken from rework_counters inside the same statement, and
+    trg_rework_log_counter advances the counter, so concurrent stations
+    cannot hand out the same number (ux_rework_log_pcb_id_rework_no backs
+    this up).
+    """
+    now = datetime.now().replace(microsecond=0)
+
+    with write_transaction() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO rework_log (pcb_id, rework_no, rework_action, rework_date,
+                                    rework_done_by, rework_epoch)
+            SELECT ?1, COALESCE(
+                       (SELECT last_rework_no FROM rework_counters WHERE pcb_id = ?1), 0
+                   ) + 1, ?2, ?3, ?4, ?5
+            RETURNING rework_no
+            """,
+            (pcbid, reason, now.strftime("%Y-%m-%d %H:%M:%S"), operator, to_epoch(now)),
+        )
+        rework_no = cursor.fetchone()[0]
+        _after_commit(_pcb_index_add, [pcbid])
+    return rework_no
+
+
+_PCB_SNAPSHOT_SQL = """
+    SELECT 0, sr_no, pcb_id, model, timestamp, rejection_stage, rejection_details
+    FROM entries WHERE pcb_id = ?
+    UNION ALL
+    SELECT 1, rework_no, rework_action, rework_date, rework_done_by, NULL, NULL
+    FROM rework_log WHERE pcb_id = ?
+    ORDER BY 1, 2
+"""
+
+
+def _pcb_snapshot(cur, pcbid):
+    entry = None
+    reworks = []
+    cur.execute(_PCB_SNAPSHOT_SQL, (pcbid, pcbid))
+    for row in cur.fetchall():
+        if row[0] == 0:
+            entry = row[1:]
+        else:
+            reworks.append(row[1:5])
+    return {"entry": entry, "reworks": reworks}
+
+
+def get_pcb_snapshot(pcbid):
+    """Fetches a PCB's pending entry and ordered rework history in one query.
+
+    Returns a dict with "entry" (the entries row, or None) and "reworks"
+    (rework_no, rework_action, rework_date, rework_done_by tuples).
+    """
+    try:
+        snapshot = _pcb_snapshot(_read_cursor(), pcbid)
+        snapshot["reworks"] = _with_archived_reworks(pcbid, snapshot["reworks"])
+        return snapshot
+    except Exception as e:
+        print(f"Error fetching snapshot for PCB ID: {e}")
+        return {"entry": None, "reworks": []}
+
+
+def submit_rework(pcbid, rework_action, operator):
+    """Logs a rework and clears the pending entry in a single transaction.
+
+    Returns the PCB snapshot as committed (see get_pcb_snapshot) plus
+    "was_pending" (an entry existed) and "rework_no".
+    """
+    with write_transaction() as cur:
+        cur.execute("SELECT 1 FROM entries WHERE pcb_id = ?", (pcbid,))
+        was_pending = cur.fetchone() is not None
+        rework_no = insert_rework(pcbid, rework_action, operator)
+        if was_pending:
+            cur.execute("DELETE FROM entries WHERE pcb_id = ?", (pcbid,))
+        snapshot = _pcb_snapshot(cur, pcbid)
+    # Archives cannot be attached inside the transaction; merge them after.
+    snapshot["reworks"] = _with_archived_reworks(pcbid, snapshot["reworks"])
+    snapshot["was_pending"] = was_pending
+    snapshot["rework_no"] = rework_no
+    return snapshot
+
+
+SEARCH_LIMIT = 200
+
+
+def _fts_query(text):
+    """Turns free text into an FTS5 query: every word must match, as a prefix.
+
+    Each word is quoted, so characters like '-' or ':' in designators are
+    not read as FTS5 syntax.
+    """
+    terms = [word.replace('"', '""') for word in text.split()]
+    return " ".join(f'"{term}"*' for term in terms if term)
+
+
+def search_history(text, limit=SEARCH_LIMIT):
+    """Full-text search over rework actions and rejection stage/details,
+    including the rejections of boards that have since been reworked.
+
+    Returns up to limit rows of (source, pcb_id, date, text, detail), best
+    match first; source is "Rework" (detail = done by) or "Rejection" (detail
+    = rejection stage).
+    """
+    query = _fts_query(text)
+    if not query:
+        return []
+    cur = _read_cursor()
+    cur.execute(
+        """
+        SELECT * FROM (
+            SELECT 'Rework', r.pcb_id, r.rework_date, r.rework_action,
+                   r.rework_done_by, bm25(rework_fts) AS score
+            FROM rework_fts JOIN rework_log r ON r.id = rework_fts.rowid
+            WHERE rework_fts MATCH ?
+            ORDER BY score LIMIT ?
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT 'Rejection', h.pcb_id, h.timestamp, h.rejection_details,
+                   h.rejection_stage, bm25(rejection_fts) AS score
+            FROM rejection_fts
+            JOIN rejection_history h ON h.sr_no = rejection_fts.rowid
+            WHERE rejection_fts MATCH ?
+            ORDER BY score LIMIT ?
+        )
+        ORDER BY score LIMIT ?
+        """,
+        (query, limit, query, limit, limit),
+    )
+    return [row[:5] for row in cur.fetchall()]
+
+
+def get_defect_pareto(date_from, date_to, model=None, stage=None, limit=20):
+    """Top rejection reasons between two YYYY-MM-DD days (inclusive).
+
+    Reads only defect_rollup. Returns (reason, defects, percent,
+    cumulative_percent) rows, most frequent first, optionally for one model
+    and/or stage.
+    """
+    conditions = ["day BETWEEN ? AND ?"]
+    params = [date_from, date_to]
+    if model:
+        conditions.append("model = ?")
+        params.append(model)
+    if stage:
+        conditions.append("rejection_stage = ?")
+        params.append(stage)
+
+    cur = _read_cursor()
+    cur.execute(
+        f"""
+        SELECT rejection_details, SUM(defects) AS total
+        FROM defect_rollup
+        WHERE {" AND ".join(conditions)}
+        GROUP BY rejection_details
+        ORDER BY total DESC, rejection_details
+        """,
+        params,
+    )
+    rows = cur.fetchall()
+    grand_total = sum(total for _, total in rows) or 1
+    pareto = []
+    running = 0
+    for reason, total in rows[:limit]:
+        running += total
+        pareto.append(
+            (
+                reason,
+                total,
+                round(100 * total / grand_total, 1),
+                round(100 * running / grand_total, 1),
+            )
+        )
+    return pareto
+
 
-    cursor.execute(
-        "INSERT INTO rework_log (pcb_id, rework_no, rework_action, rework_date, rework_done_by) VALUES (?, ?, ?, ?, ?)",
-        (pcbid, rework_no, reason, now, operator),
+def get_rollup_stages():
+    """Distinct rejection stages seen in defect_rollup, for filter lists."""
+    cur = _read_cursor()
+    cur.execute(
+        "SELECT DISTINCT rejection_stage FROM defect_rollup ORDER BY rejection_stage"
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+UNKNOWN_MODEL = "(unknown)"
+
+
+def _fold_repeat_reworks(cur, low, high):
+    """Adds to reworked_multi the boards that got their first repeat rework
+    among rework_log ids low < id <= high, on the day of their first rework.
+
+    A board whose first rework has been archived is not counted; that day is
+    older than the archive cut-off.
+    """
+    cur.execute(
+        """
+        INSERT INTO kpi_daily (day, model, reworked_multi)
+        SELECT substr(f.rework_date, 1, 10), COALESCE(m.model, ?), COUNT(*)
+        FROM (
+            SELECT DISTINCT pcb_id FROM rework_log
+            WHERE id > ? AND id <= ? AND rework_no >= 2
+        ) r
+        JOIN rework_log f ON f.pcb_id = r.pcb_id AND f.rework_no = 1
+        LEFT JOIN pcb_models m ON m.pcb_id = r.pcb_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM rework_log o
+            WHERE o.pcb_id = r.pcb_id AND o.rework_no >= 2 AND o.id <= ?
+        )
+        GROUP BY 1, 2
+        ON CONFLICT (day, model) DO UPDATE SET
+            reworked_multi = reworked_multi + excluded.reworked_multi
+        """,
+        (UNKNOWN_MODEL, low, high, low),
+    )
+
+
+def _recount_repeat_reworks(cur):
+    cur.execute("UPDATE kpi_daily SET reworked_multi = 0")
+    cur.execute("SELECT value FROM kpi_state WHERE name = 'rework_log_id'")
+    _fold_repeat_reworks(cur, 0, cur.fetchone()[0])
+
+
+def refresh_kpi_daily():
+    """Folds rework_log rows added since the last refresh into kpi_daily.
+
+    Only rows above the stored id high-water mark are read, so the cost
+    depends on the reworks since the last refresh, not on total history.
+    Returns the number of rework rows folded in.
+    """
+    with write_transaction() as cur:
+        cur.execute("SELECT value FROM kpi_state WHERE name = 'rework_log_id'")
+        low = cur.fetchone()[0]
+        cur.execute("SELECT COALESCE(MAX(id), 0) FROM rework_log")
+        high = cur.fetchone()[0]
+        if high <= low:
+            return 0
+        cur.execute(
+            """
+            INSERT INTO kpi_daily (day, model, reworked, rework_actions)
+            SELECT substr(r.rework_date, 1, 10), COALESCE(m.model, ?),
+                   SUM(r.rework_no = 1), COUNT(*)
+            FROM rework_log r
+            LEFT JOIN pcb_models m ON m.pcb_id = r.pcb_id
+            WHERE r.id > ? AND r.id <= ?
+            GROUP BY 1, 2
+            ON CONFLICT (day, model) DO UPDATE SET
+                reworked = reworked + excluded.reworked,
+                rework_actions = rework_actions + excluded.rework_actions
+            """,
+            (UNKNOWN_MODEL, low, high),
+        )
+        _fold_repeat_reworks(cur, low, high)
+        cur.execute(
+            "UPDATE kpi_state SET value = ? WHERE name = 'rework_log_id'", (high,)
+        )
+    return high - low
+
+
+def get_kpi_summary(date_from, model=None):
+    """Per-day, per-model KPIs from date_from (YYYY-MM-DD) to today, newest first.
+
+    Returns (day, model, rejected, reworked, reworked_multi, rework_fpy,
+    backlog) rows. reworked counts boards first reworked that day and
+    reworked_multi those of them that have been reworked again since;
+    rework_fpy is the percentage that needed no second rework so far. backlog
+    is the number of boards of that model still pending at the end of the
+    day, worked back from today's pending entries.
+    """
+    refresh_kpi_daily()
+    cur = _read_cursor()
+    conditions = ["day >= ?"]
+    params = [date_from]
+    if model:
+        conditions.append("model = ?")
+        params.append(model)
+    cur.execute(
+        f"""
+        SELECT day, model, rejected, reworked, reworked_multi
+        FROM kpi_daily
+        WHERE {" AND ".join(conditions)}
+        ORDER BY day DESC, model
+        """,
+        params,
     )
-    conn.commit()
-    conn.close()
+    rows = cur.fetchall()
+    cur.execute("SELECT model, COUNT(*) FROM entries GROUP BY model")
+    backlog = dict(cur.fetchall())
+
+    summary = []
+    for day, row_model, rejected, reworked, reworked_multi in rows:
+        if row_model == UNKNOWN_MODEL:
+            end_of_day_backlog = None
+        else:
+            end_of_day_backlog = backlog.get(row_model, 0)
+            # Walking back a day undoes that day's rejections and reworks.
+            backlog[row_model] = end_of_day_backlog - rejected + reworked
+        rework_fpy = (
+            round(100 * (reworked - reworked_multi) / reworked, 1) if reworked else None
+        )
+        summary.append(
+            (
+                day,
+                row_model,
+                rejected,
+                reworked,
+                reworked_multi,
+                rework_fpy,
+                end_of_day_backlog,
+            )
+        )
+    return summary
 
 
 def validate_operator(username, password):
     """Validates an operator's credentials."""
-    conn, cursor = get_conn_and_cursor()
-    if not conn:
-        return False
-
     try:
+        cursor = _read_cursor()
         cursor.execute(
             "SELECT * FROM operators WHERE username=? AND password=?",
             (username, password),
@@ -235,8 +1420,6 @@ def validate_operator(username, password):
     except Exception as e:
         print(f"Error validating operator: {e}")
         return False
-    finally:
-        conn.close()
 
 
 def validate_admin(username, password):
@@ -246,47 +1429,424 @@ def validate_admin(username, password):
 
 def add_operator(username, password):
     """Adds a new operator to the database."""
-    conn, cursor = get_conn_and_cursor()
-    if not conn:
-        return False
-
     try:
-        cursor.execute(
-            "INSERT INTO operators (username, password) VALUES (?, ?)",
-            (username, password),
-        )
-        conn.commit()
+        with write_transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO operators (username, password) VALUES (?, ?)",
+                (username, password),
+            )
         return True
     except sqlite3.IntegrityError:
         return False
     except Exception as e:
         print(f"Database Error: {e}")
         return False
-    finally:
-        conn.close()
 
 
 def list_all_operators():
     """Fetches all operators from the database."""
-    conn, cursor = get_conn_and_cursor()
-    if not conn:
-        return []
-
     try:
+        cursor = _read_cursor()
         cursor.execute("SELECT username, password FROM operators")
         results = cursor.fetchall()
         return results
     except Exception as e:
         print(f"Error listing operators: {e}")
         return []
+
+
+def fetch_entries_table():
+    """Fetches every entry with the 6 columns shown in the View Entries window."""
+    cur = _read_cursor()
+    cur.execute(
+        """
+        SELECT sr_no, pcb_id, model, timestamp,
+               COALESCE(rejection_stage, ''),
+               COALESCE(rejection_details, '')
+        FROM entries
+        """
+    )
+    return cur.fetchall()
+
+
+def fetch_rework_log_table():
+    """Fetches every rework log row for the Rework Log Viewer."""
+    cur = _read_cursor()
+    cur.execute(
+        "SELECT id, pcb_id, rework_no, rework_action, rework_date, rework_done_by FROM rework_log"
+    )
+    return cur.fetchall()
+
+
+PAGE_SIZE = 200
+
+_ENTRIES_PAGE_SQL = """
+    SELECT sr_no, pcb_id, model, timestamp,
+           COALESCE(rejection_stage, ''),
+           COALESCE(rejection_details, '')
+    FROM entries
+"""
+
+_REWORK_LOG_PAGE_SQL = """
+    SELECT id, pcb_id, rework_no, rework_action, rework_date, rework_done_by
+    FROM rework_log
+"""
+
+
+def _keyset_page(select_sql, key, after, before, limit, where=(), params=()):
+    """Runs select_sql for one page ordered by key (an INTEGER PRIMARY KEY).
+
+    after/before are exclusive bounds; with before the rows are fetched
+    backwards and returned in ascending order.
+    """
+    conditions = list(where)
+    args = list(params)
+    if before is not None:
+        conditions.append(f"{key} < ?")
+        args.append(before)
+    elif after is not None:
+        conditions.append(f"{key} > ?")
+        args.append(after)
+    sql = select_sql
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += f" ORDER BY {key} {'DESC' if before is not None else 'ASC'} LIMIT ?"
+    args.append(limit)
+
+    cur = _read_cursor()
+    cur.execute(sql, args)
+    rows = cur.fetchall()
+    if before is not None:
+        rows.reverse()
+    return rows
+
+
+def to_epoch(dt):
+    """Seconds for a naive local datetime, on the same scale as ts_epoch and
+    rework_epoch (the wall clock read as UTC, like strftime('%s'))."""
+    return calendar.timegm(dt.timetuple())
+
+
+def date_range_conditions(column, start=None, end=None, shift=None):
+    """Returns (conditions, params) restricting an epoch column.
+
+    start/end are naive local datetimes (end exclusive); shift is a
+    (start, end) pair of seconds since midnight, wrapping past midnight when
+    end < start. The range bounds are index seeks; the shift test only
+    filters the rows inside the range.
+    """
+    conditions = []
+    params = []
+    if start is not None:
+        conditions.append(f"{column} >= ?")
+        params.append(to_epoch(start))
+    if end is not None:
+        conditions.append(f"{column} < ?")
+        params.append(to_epoch(end))
+    if shift is not None:
+        shift_start, shift_end = shift
+        op = "AND" if shift_start < shift_end else "OR"
+        conditions.append(f"({column} % 86400 >= ? {op} {column} % 86400 < ?)")
+        params.extend((shift_start, shift_end))
+    return conditions, params
+
+
+def _ranged_key(key, start, end):
+    # With a date range, "+key" stops SQLite from walking the primary key in
+    # order and filtering every row; it seeks the epoch index instead and
+    # sorts the (few) rows in range.
+    return key if start is None and end is None else f"+{key}"
+
+
+def fetch_entries_page(
+    after=None, before=None, limit=PAGE_SIZE, start=None, end=None, shift=None
+):
+    """Fetches one page of View Entries rows keyed on sr_no."""
+    where, params = date_range_conditions("ts_epoch", start, end, shift)
+    key = _ranged_key("sr_no", start, end)
+    return _keyset_page(_ENTRIES_PAGE_SQL, key, after, before, limit, where, params)
+
+
+def fetch_rework_log_page(
+    after=None, before=None, limit=PAGE_SIZE, start=None, end=None, shift=None
+):
+    """Fetches one page of Rework Log Viewer rows keyed on id."""
+    where, params = date_range_conditions("rework_epoch", start, end, shift)
+    key = _ranged_key("id", start, end)
+    return _keyset_page(_REWORK_LOG_PAGE_SQL, key, after, before, limit, where, params)
+
+
+def _count(table, epoch_column, start, end, shift):
+    conditions, params = date_range_conditions(epoch_column, start, end, shift)
+    sql = f"SELECT COUNT(*) FROM {table}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    cur = _read_cursor()
+    cur.execute(sql, params)
+    return cur.fetchone()[0]
+
+
+def count_entries(start=None, end=None, shift=None):
+    return _count("entries", "ts_epoch", start, end, shift)
+
+
+def count_rework_logs(start=None, end=None, shift=None):
+    return _count("rework_log", "rework_epoch", start, end, shift)
+
+
+EXPORT_CHUNK_SIZE = 5000
+
+
+def stream_query(sql, params=(), chunk_size=EXPORT_CHUNK_SIZE):
+    """Runs a read query and returns (column_names, chunks).
+
+    chunks yields lists of at most chunk_size rows, so exports never hold a
+    whole table in memory. It uses this thread's reader connection.
+    """
+    cur = _read_cursor()
+    cur.execute(sql, params)
+    columns = [col[0] for col in cur.description]
+
+    def chunks():
+        try:
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cur.close()
+
+    return columns, chunks()
+
+
+def read_max_keys(tables):
+    """Returns {table: MAX(key) or 0} for (table, key) pairs, read in one snapshot."""
+    cur = _read_cursor()
+    cur.execute(
+        "SELECT "
+        + ", ".join(
+            f"(SELECT COALESCE(MAX({key}), 0) FROM {table})" for table, key in tables
+        )
+    )
+    return dict(zip((table for table, _ in tables), cur.fetchone()))
+
+
+BACKUP_PAGES_PER_STEP = 256
+
+
+def backup_database(dest_path, pages=BACKUP_PAGES_PER_STEP):
+    """Copies the live database to dest_path with sqlite3's online backup API.
+
+    The copy runs in steps of `pages` pages from its own connection, inside one
+    read transaction: under WAL that pins a consistent snapshot without
+    blocking writers, so the backup never restarts because of a concurrent scan.
+    """
+    src = _open_connection(get_db_path())
+    dst = sqlite3.connect(dest_path)
+    try:
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master")
+        src.backup(dst, pages=pages, sleep=0.001)
+        src.execute("COMMIT")
+    finally:
+        dst.close()
+        src.close()
+
+
+# ---------- Archiving ----------
+# archive_old_rows moves rework_log rows older than a cutoff into one SQLite
+# file per month under archives/ next to the database. entries only holds
+# boards still waiting for rework, so it is never archived. Summaries
+# (defect_rollup, kpi_daily), rework_counters, pcb_models and
+# rejection_history stay in the hot database, so numbering, KPIs,
+# autocomplete and rejection search are unaffected; archived reworks drop out
+# of full-text search. Space freed in the hot file is reused by new rows
+# rather than returned to the filesystem.
+
+ARCHIVE_DIR_NAME = "archives"
+ARCHIVE_PREFIX = "rework_archive_"
+ARCHIVE_AFTER_DAYS = 180
+
+_ARCHIVE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS archive.rework_log (
+        id INTEGER PRIMARY KEY,
+        pcb_id TEXT NOT NULL,
+        rework_no INTEGER NOT NULL,
+        rework_action TEXT NOT NULL,
+        rework_date TEXT NOT NULL,
+        rework_done_by TEXT NOT NULL,
+        rework_epoch INTEGER
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS archive.idx_rework_log_pcb_id ON rework_log (pcb_id)",
+)
+
+# (table, key, columns copied, epoch column) of each archived table.
+_ARCHIVED_TABLES = (
+    ("rework_log", "id", REWORK_LOG_COLUMNS + ", rework_epoch", "rework_epoch"),
+)
+
+
+def get_archive_dir():
+    return os.path.join(os.path.dirname(os.path.abspath(get_db_path())), ARCHIVE_DIR_NAME)
+
+
+def archive_path(month):
+    """Path of the archive file for a YYYY-MM month."""
+    return os.path.join(get_archive_dir(), f"{ARCHIVE_PREFIX}{month}.db")
+
+
+def _month_bounds(month):
+    year, month_no = (int(part) for part in month.split("-"))
+    start = datetime(year, month_no, 1)
+    end = datetime(year + month_no // 12, month_no % 12 + 1, 1)
+    return to_epoch(start), to_epoch(end)
+
+
+def archive_old_rows(older_than_days=ARCHIVE_AFTER_DAYS, now=None):
+    """Moves rework_log rows older than older_than_days (counted from the
+    start of today) into per-month archive files.
+
+    Each month is copied and committed to its archive first and only then
+    deleted from the hot database, keyed on the rows that reached the
+    archive, so an interrupted run loses nothing and can simply be repeated.
+    Returns {month: {"rework_log": n}} for the rows moved.
+    """
+    now = now or datetime.now()
+    cutoff = to_epoch(datetime(now.year, now.month, now.day)) - older_than_days * 86400
+
+    cur = _read_cursor()
+    cur.execute(
+        """
+        SELECT DISTINCT strftime('%Y-%m', rework_epoch, 'unixepoch') FROM rework_log
+        WHERE rework_epoch < ?
+        """,
+        (cutoff,),
+    )
+    months = sorted(row[0] for row in cur.fetchall())
+    if months:
+        os.makedirs(get_archive_dir(), exist_ok=True)
+
+    moved = {}
+    for month in months:
+        low, high = _month_bounds(month)
+        moved[month] = _archive_range(month, low, min(high, cutoff))
+    return moved
+
+
+def _archive_range(month, low, high):
+    counts = {}
+    with _write_lock:
+        conn = _get_writer()
+        conn.execute("ATTACH DATABASE ? AS archive", (archive_path(month),))
+        try:
+            for sql in _ARCHIVE_SCHEMA:
+                conn.execute(sql)
+            with write_transaction() as cur:
+                for table, _, columns, epoch in _ARCHIVED_TABLES:
+                    cur.execute(
+                        f"""
+                        INSERT OR IGNORE INTO archive.{table} ({columns})
+                        SELECT {columns} FROM main.{table}
+                        WHERE {epoch} >= ? AND {epoch} < ?
+                        """,
+                        (low, high),
+                    )
+                    cur.execute(
+                        f"""
+                        INSERT OR IGNORE INTO main.archive_index (pcb_id, month)
+                        SELECT DISTINCT pcb_id, ? FROM archive.{table}
+                        WHERE {epoch} >= ? AND {epoch} < ?
+                        """,
+                        (month, low, high),
+                    )
+            with write_transaction() as cur:
+                for table, key, _, epoch in _ARCHIVED_TABLES:
+                    cur.execute(
+                        f"""
+                        DELETE FROM main.{table}
+                        WHERE {epoch} >= ? AND {epoch} < ?
+                          AND {key} IN (SELECT {key} FROM archive.{table})
+                        """,
+                        (low, high),
+                    )
+                    counts[table] = cur.rowcount
+        finally:
+            conn.execute("DETACH DATABASE archive")
+    return counts
+
+
+def _archived_rows(pcbid, sql):
+    """Runs sql (with {db} for the schema name and one ? for the PCB ID)
+    against each archive file holding rows for pcbid, oldest month first.
+
+    The files are attached read-only to a scratch connection, so the
+    thread's reader is never left with archives attached.
+    """
+    cur = _read_cursor()
+    cur.execute(
+        "SELECT month FROM archive_index WHERE pcb_id = ? ORDER BY month", (pcbid,)
+    )
+    months = [row[0] for row in cur.fetchall()]
+    if not months:
+        return []
+
+    rows = []
+    conn = sqlite3.connect(":memory:", uri=True)
+    try:
+        for month in months:
+            path = archive_path(month)
+            if not os.path.exists(path):
+                continue
+            uri = Path(path).resolve().as_uri() + "?mode=ro"
+            conn.execute("ATTACH DATABASE ? AS archive", (uri,))
+            try:
+                rows.extend(conn.execute(sql.format(db="archive"), (pcbid,)).fetchall())
+            finally:
+                conn.execute("DETACH DATABASE archive")
     finally:
         conn.close()
+    return rows
+
+
+def _with_archived_reworks(pcbid, reworks):
+    """Adds archived (rework_no, action, date, done_by) rows to reworks, in order."""
+    archived = _archived_rows(
+        pcbid,
+        "SELECT rework_no, rework_action, rework_date, rework_done_by "
+        "FROM {db}.rework_log WHERE pcb_id = ?",
+    )
+    if not archived:
+        return reworks
+    return sorted(set(archived) | set(reworks))
+
+
+def delete_all_data():
+    """Deletes all entries, rejection and rework history and models in one
+    transaction."""
+    with write_transaction() as cursor:
+        cursor.execute("DELETE FROM entries")
+        cursor.execute("DELETE FROM rejection_history")
+        cursor.execute("DELETE FROM rework_log")
+        cursor.execute("DELETE FROM rework_counters")
+        cursor.execute("DELETE FROM defect_rollup")
+        cursor.execute("DELETE FROM pcb_models")
+        cursor.execute("DELETE FROM kpi_daily")
+        cursor.execute("UPDATE kpi_state SET value = 0")
+        cursor.execute("DELETE FROM archive_index")
+        # Otherwise the next sync would push the wiped rows to central.
+        cursor.execute("DELETE FROM sync_outbox")
+        cursor.execute("DELETE FROM Models")
+    _invalidate_models_cache()
+    with _pcb_ids_lock:
+        if _pcb_ids is not None:
+            _pcb_ids.clear()
 
 
 def fetch_with_rework_logs():
-    conn, cur = get_conn_and_cursor()
-    if not conn:
-        return []
+    cur = _read_cursor()
     cur.execute(
         """
         SELECT serial_number, product_name, issue, status, rework_done_by, date, details
@@ -294,15 +1854,11 @@ def fetch_with_rework_logs():
         WHERE status = 'With Rework'
     """
     )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return cur.fetchall()
 
 
 def fetch_before_rework_logs():
-    conn, cur = get_conn_and_cursor()
-    if not conn:
-        return []
+    cur = _read_cursor()
     cur.execute(
         """
         SELECT serial_number, product_name, issue, status, rework_done_by, date, details
@@ -310,9 +1866,7 @@ def fetch_before_rework_logs():
         WHERE status = 'Before Rework'
     """
     )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return cur.fetchall()
 
 
 def fetch_with_rework():
@@ -320,11 +1874,8 @@ def fetch_with_rework():
     Fetches all entries with at least one rework log. The query is
     structured to match the 7 columns of the Treeview widget in main.py.
     """
-    conn, cur = get_conn_and_cursor()
-    if not conn:
-        return []
-
     try:
+        cur = _read_cursor()
         cur.execute(
             """
             SELECT
@@ -345,14 +1896,10 @@ def fetch_with_rework():
     except Exception as e:
         print(f"Error fetching data with rework: {e}")
         return []
-    finally:
-        conn.close()
 
 
 def fetch_before_rework():
-    conn, cur = get_conn_and_cursor()
-    if not conn:
-        return []
+    cur = _read_cursor()
     cur.execute(
         """
         SELECT e.id,
@@ -368,9 +1915,7 @@ def fetch_before_rework():
         ORDER BY e.id DESC
     """
     )
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    return cur.fetchall()
 
 
 def fetch_all_entries():
@@ -378,11 +1923,8 @@ def fetch_all_entries():
     Fetches all entries, regardless of rework status, with a single query.
     This can be a helpful debug function or for a general 'view all' log.
     """
-    conn, cur = get_conn_and_cursor()
-    if not conn:
-        return []
-
     try:
+        cur = _read_cursor()
         cur.execute(
             """
             SELECT
@@ -403,5 +1945,52 @@ def fetch_all_entries():
     except Exception as e:
         print(f"Error fetching all entries: {e}")
         return []
-    finally:
-        conn.close()
+
+
+# ---------- Instrumentation ----------
+
+# Timed per call by query_stats (statements are timed on every connection).
+# Wrapped here, at the end, so calls between these functions are timed too.
+TIMED_FUNCTIONS = (
+    "init_db",
+    "migrate_db",
+    "get_rework_log_by_pcbid",
+    "insert_model",
+    "get_all_models",
+    "refresh_pcb_index",
+    "complete_pcb_id",
+    "is_known_pcb_id",
+    "insert_entry",
+    "insert_entries_bulk",
+    "search_entry_by_pcbid",
+    "delete_entry_by_pcb_id",
+    "get_all_reworks_by_pcbid",
+    "get_rework_count",
+    "insert_rework",
+    "get_pcb_snapshot",
+    "submit_rework",
+    "search_history",
+    "get_defect_pareto",
+    "get_rollup_stages",
+    "refresh_kpi_daily",
+    "get_kpi_summary",
+    "validate_operator",
+    "validate_admin",
+    "add_operator",
+    "list_all_operators",
+    "fetch_entries_page",
+    "fetch_rework_log_page",
+    "count_entries",
+    "count_rework_logs",
+    "read_max_keys",
+    "backup_database",
+    "archive_old_rows",
+    "delete_all_data",
+    "fetch_with_rework",
+    "fetch_before_rework",
+    "fetch_all_entries",
+)
+
+for _name in TIMED_FUNCTIONS:
+    globals()[_name] = query_stats.timed(globals()[_name])
+del _name
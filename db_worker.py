@@ -0,0 +1,134 @@
+import queue
+import threading
+import tkinter as tk
+from tkinter import messagebox
+
+# How often the Tk side checks for finished requests while any are pending.
+POLL_INTERVAL_MS = 30
+
+
+class DbRequest:
+    """A queued call. cancel() drops it if it has not run or its result
+    has not been delivered yet."""
+
+    def __init__(self, widget, func, args, kwargs, on_done, on_error):
+        self.widget = widget
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class DbWorker:
+    """A dedicated thread that runs db_handler calls off the Tk mainloop.
+
+    submit() is called from the Tk thread; callbacks are run back on the Tk
+    thread by polling with after(), since Tk must not be touched from the
+    worker thread.
+    """
+
+    def __init__(self, name="db"):
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._pending = 0
+        self._poll_job = None
+        self._poll_root = None
+        self._thread = threading.Thread(
+            target=self._run, name=f"{name}-worker", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, widget, func, *args, on_done=None, on_error=None, **kwargs):
+        """Queues func(*args, **kwargs) and returns its DbRequest.
+
+        on_done(result) or on_error(exception) is called on the Tk thread,
+        unless the request was cancelled or widget has been destroyed.
+        """
+        request = DbRequest(widget, func, args, kwargs, on_done, on_error)
+        self._pending += 1
+        self._requests.put(request)
+        self._schedule_poll(widget)
+        return request
+
+    def _run(self):
+        while True:
+            request = self._requests.get()
+            if request.cancelled:
+                self._results.put((request, True, None))
+                continue
+            try:
+                result = request.func(*request.args, **request.kwargs)
+            except Exception as e:
+                self._results.put((request, False, e))
+            else:
+                self._results.put((request, True, result))
+
+    def _schedule_poll(self, widget):
+        # Poll on the root window: a dialog destroyed mid-request would take
+        # its after() job with it and stall every other widget's results.
+        # The app replaces its root between screens, so it is looked up from
+        # the submitting widget each time.
+        root = _root_of(widget)
+        if root is not None and root is not self._poll_root:
+            if self._poll_job is not None and _widget_alive(self._poll_root):
+                self._poll_root.after_cancel(self._poll_job)
+            self._poll_root = root
+            self._poll_job = None
+        if self._poll_job is not None and _widget_alive(self._poll_root):
+            return
+        self._poll_job = None
+        if _widget_alive(self._poll_root):
+            self._poll_job = self._poll_root.after(POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self):
+        self._poll_job = None
+        while True:
+            try:
+                request, ok, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if request.cancelled or not _widget_alive(request.widget):
+                continue
+            if ok:
+                if request.on_done:
+                    request.on_done(value)
+            elif request.on_error:
+                request.on_error(value)
+            else:
+                messagebox.showerror("Database Error", str(value))
+        if self._pending:
+            self._schedule_poll(self._poll_root)
+
+
+def _root_of(widget):
+    try:
+        return widget.nametowidget(".")
+    except tk.TclError:
+        return None
+
+
+def _widget_alive(widget):
+    try:
+        return bool(widget is not None and widget.winfo_exists())
+    except tk.TclError:
+        return False
+
+
+_workers = {}
+
+
+def get_worker(name="db"):
+    """Returns the shared worker called name, starting it on first use.
+
+    Long jobs such as backups use their own worker so PCB lookups never
+    queue behind them.
+    """
+    if name not in _workers:
+        _workers[name] = DbWorker(name)
+    return _workers[name]
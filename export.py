@@ -0,0 +1,233 @@
+"""Streams entries, rework_log and a joined traceability view to CSV or
+Parquet files for analytics.
+
+Rows are read with db_handler.stream_query and written chunk by chunk (one
+Parquet row group per chunk), so memory use does not depend on the table
+size and there is no Excel row limit. Files are written under a temporary
+name and renamed when complete, so a nightly job never picks up half a file.
+Parquet needs pyarrow, which is only imported for a Parquet export. Rows
+moved to the monthly archives are not included.
+"""
+
+import csv
+import datetime
+import gzip
+import os
+
+from db_handler import (
+    stream_query,
+    date_range_conditions,
+    ENTRIES_COLUMNS,
+    REWORK_LOG_COLUMNS,
+    UNKNOWN_MODEL,
+)
+
+EXPORT_DIR = "exports"
+EXPORT_CHUNK_ROWS = 50000
+FORMATS = ("csv", "parquet")
+
+# Every view as (fields, parts). fields are (name, arrow type) pairs for the
+# Parquet schema; each part is (select, epoch column, key, model condition)
+# and the parts are joined with UNION ALL, so a view is read in one snapshot.
+VIEWS = {
+    "entries": (
+        (
+            ("sr_no", "int64"),
+            ("pcb_id", "string"),
+            ("model", "string"),
+            ("timestamp", "string"),
+            ("rejection_stage", "string"),
+            ("rejection_details", "string"),
+        ),
+        [(f"SELECT {ENTRIES_COLUMNS} FROM entries", "ts_epoch", "sr_no", "model = ?")],
+    ),
+    "rework_log": (
+        (
+            ("id", "int64"),
+            ("pcb_id", "string"),
+            ("rework_no", "int64"),
+            ("rework_action", "string"),
+            ("rework_date", "string"),
+            ("rework_done_by", "string"),
+        ),
+        [
+            (
+                f"SELECT {REWORK_LOG_COLUMNS} FROM rework_log",
+                "rework_epoch",
+                "id",
+                "EXISTS (SELECT 1 FROM pcb_models m"
+                " WHERE m.pcb_id = rework_log.pcb_id AND m.model = ?)",
+            )
+        ],
+    ),
+    # One row per event in a board's history: every rework (with the board's
+    # model, which rework_log does not carry), then every still-pending
+    # rejection.
+    "traceability": (
+        (
+            ("pcb_id", "string"),
+            ("model", "string"),
+            ("event", "string"),
+            ("event_date", "string"),
+            ("rejection_stage", "string"),
+            ("rejection_details", "string"),
+            ("rework_no", "int64"),
+            ("rework_action", "string"),
+            ("rework_done_by", "string"),
+        ),
+        [
+            (
+                f"""
+                SELECT r.pcb_id, COALESCE(m.model, '{UNKNOWN_MODEL}'), 'reworked',
+                       r.rework_date, NULL, NULL, r.rework_no, r.rework_action,
+                       r.rework_done_by
+                FROM rework_log r
+                LEFT JOIN pcb_models m ON m.pcb_id = r.pcb_id
+                """,
+                "r.rework_epoch",
+                "r.id",
+                "m.model = ?",
+            ),
+            (
+                """
+                SELECT pcb_id, model, 'rejected', timestamp, rejection_stage,
+                       rejection_details, NULL, NULL, NULL
+                FROM entries
+                """,
+                "ts_epoch",
+                "sr_no",
+                "model = ?",
+            ),
+        ],
+    ),
+}
+
+
+def view_query(view, start=None, end=None, shift=None, model=None):
+    """Returns (sql, params) for a view, filtered like fetch_rework_log_page
+    plus an optional model."""
+    _, parts = VIEWS[view]
+    selects = []
+    params = []
+    for select, epoch_column, key, model_condition in parts:
+        conditions, part_params = date_range_conditions(epoch_column, start, end, shift)
+        if model is not None:
+            conditions.append(model_condition)
+            part_params.append(model)
+        sql = select
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        # "+key" makes SQLite seek the epoch index rather than walk the key.
+        order = key if start is None and end is None else f"+{key}"
+        selects.append(f"SELECT * FROM ({sql} ORDER BY {order})")
+        params.extend(part_params)
+    return " UNION ALL ".join(selects), params
+
+
+def stream_view(
+    view, start=None, end=None, shift=None, model=None, chunk_size=EXPORT_CHUNK_ROWS
+):
+    """Returns (column_names, chunks) for a view; see db_handler.stream_query."""
+    fields, _ = VIEWS[view]
+    sql, params = view_query(view, start, end, shift, model)
+    _, chunks = stream_query(sql, params, chunk_size)
+    return [name for name, _ in fields], chunks
+
+
+class _CsvWriter:
+    def __init__(self, path, fields, gzipped=False):
+        if gzipped:
+            self.file = gzip.open(path, "wt", newline="", encoding="utf-8")
+        else:
+            self.file = open(path, "w", newline="", encoding="utf-8")
+        self.csv = csv.writer(self.file)
+        self.csv.writerow([name for name, _ in fields])
+
+    def write(self, rows):
+        self.csv.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetWriter:
+    def __init__(self, path, fields, gzipped=False):
+        # gzipped is ignored: Parquet compresses its own pages.
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ImportError(f"Parquet export needs pyarrow ({e})") from e
+        self.pa = pyarrow
+        self.schema = pyarrow.schema(
+            [(name, getattr(pyarrow, arrow_type)()) for name, arrow_type in fields]
+        )
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        self.writer.write_table(
+            self.pa.Table.from_arrays(
+                [
+                    self.pa.array(column, type=field.type)
+                    for column, field in zip(columns, self.schema)
+                ],
+                schema=self.schema,
+            )
+        )
+
+    def close(self):
+        self.writer.close()
+
+
+_WRITERS = {"csv": _CsvWriter, "parquet": _ParquetWriter}
+
+
+def export_view(
+    view,
+    path,
+    fmt=None,
+    start=None,
+    end=None,
+    shift=None,
+    model=None,
+    chunk_size=EXPORT_CHUNK_ROWS,
+):
+    """Writes a view to path and returns the number of rows.
+
+    fmt is "csv" or "parquet", by default taken from the extension; a .csv.gz
+    path is gzipped.
+    """
+    if fmt is None:
+        fmt = "parquet" if path.endswith(".parquet") else "csv"
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    fields, _ = VIEWS[view]
+    tmp_path = path + ".tmp"
+    writer = _WRITERS[fmt](tmp_path, fields, gzipped=path.endswith(".gz"))
+    count = 0
+    try:
+        _, chunks = stream_view(view, start, end, shift, model, chunk_size)
+        for rows in chunks:
+            writer.write(rows)
+            count += len(rows)
+    except BaseException:
+        writer.close()
+        os.remove(tmp_path)
+        raise
+    writer.close()
+    os.replace(tmp_path, path)
+    return count
+
+
+def write_export(
+    view, fmt="csv", start=None, end=None, shift=None, model=None, export_dir=EXPORT_DIR
+):
+    """Exports a view to a timestamped file in a datewise folder under
+    export_dir; returns {"file": path, "rows": count}."""
+    now = datetime.datetime.now()
+    folder = os.path.join(export_dir, now.strftime("%Y-%m-%d"))
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{view}_{now.strftime('%Y%m%d_%H%M%S')}.{fmt}")
+    rows = export_view(view, path, fmt, start, end, shift, model)
+    return {"file": path, "rows": rows}
@@ -1,12 +1,14 @@
+import time
+
+_STARTED_AT = time.perf_counter()
+
 import tkinter as tk
-from tkinter import messagebox, simpledialog, ttk
+from tkinter import messagebox, simpledialog, ttk, filedialog
 import os
 import shutil
 import datetime
-import xlsxwriter
 import sqlite3
 import sys
-import pandas as pd
 
 
 # Add this helper function at the top of main.py
@@ -20,7 +22,22 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+# Service mode: send every database call to a rework_server instead of
+# opening rework_data.db here. Must run before the db_handler imports below.
+import rework_client
+
+service_client = None
+if os.environ.get(rework_client.SERVER_URL_ENV):
+    service_client = rework_client.install(os.environ[rework_client.SERVER_URL_ENV])
+
 # Then, update your db_handler import and all other code as it was.
+from bulk_import import import_entries_file, summarise_import
+from backup import write_backup, write_incremental_backup, write_snapshot_backup
+import export
+from db_worker import get_worker
+from paged_table import PagedTable
+from date_ranges import ALL, RANGE_PRESETS, SHIFT_NAMES, date_filter
+import query_stats
 from db_handler import (
     init_db,
     get_connection,
@@ -29,24 +46,43 @@ from db_handler import (
     insert_model,
     get_all_models,
     insert_entry,
+    insert_entries_bulk,
     search_entry_by_pcbid,
     get_all_reworks_by_pcbid,
+    get_pcb_snapshot,
     insert_rework,
+    submit_rework,
     add_operator,
     list_all_operators,
     fetch_with_rework,
     fetch_before_rework,
     delete_entry_by_pcb_id,
     get_rework_log_by_pcbid,
-    get_conn_and_cursor,
     fetch_all_entries,
+    search_history,
+    get_defect_pareto,
+    get_rollup_stages,
+    get_kpi_summary,
+    complete_pcb_id,
+    is_known_pcb_id,
+    pcb_index_age,
+    refresh_pcb_index,
+    fetch_entries_page,
+    fetch_rework_log_page,
+    count_entries,
+    count_rework_logs,
+    delete_all_data,
+    archive_old_rows,
+    ARCHIVE_AFTER_DAYS,
 )
 
 
-# Run this ONCE at startup
-init_db()
 current_user = None
 
+# Reload the PCB ID autocomplete index when Do Rework opens if it is older
+# than this, to pick up boards entered at other stations.
+PCB_INDEX_MAX_AGE = 300
+
 
 # ---------- Centering Function ----------
 def center_window(win, width=600, height=500):
@@ -75,9 +111,10 @@ def show_login_window():
     password_entry = tk.Entry(login, show="*")
     password_entry.pack()
 
-    def try_login(event=None):
+    def on_checked(valid):
         global current_user
-        if validate_admin(username_entry.get(), password_entry.get()):
+        login_btn.config(state="normal")
+        if valid:
             current_user = "admin"
             login.destroy()
             open_admin_dashboard()
@@ -87,7 +124,25 @@ def show_login_window():
             password_entry.delete(0, tk.END)
             username_entry.focus_set()
 
-    tk.Button(login, text="Login", command=try_login).pack(pady=20)
+    def on_error(e):
+        login_btn.config(state="normal")
+        messagebox.showerror("Database Error", f"Could not check login: {e}")
+
+    def try_login(event=None):
+        if login_btn.cget("state") == "disabled":
+            return
+        login_btn.config(state="disabled")
+        get_worker().submit(
+            login,
+            validate_admin,
+            username_entry.get(),
+            password_entry.get(),
+            on_done=on_checked,
+            on_error=on_error,
+        )
+
+    login_btn = tk.Button(login, text="Login", command=try_login)
+    login_btn.pack(pady=20)
     login.bind("<Return>", try_login)
     login.lift()
     login.attributes("-topmost", True)
@@ -111,12 +166,10 @@ def login_operator(parent_win):
     password_entry = tk.Entry(login_win, show="*")
     password_entry.pack()
 
-    def try_login(event=None):
-        username = username_entry.get().strip()
-        password = password_entry.get().strip()
+    def on_checked(username, valid):
         global current_user
-
-        if validate_operator(username, password):
+        login_btn.config(state="normal")
+        if valid:
             current_user = username
             login_win.destroy()
             parent_win.destroy()
@@ -127,7 +180,27 @@ def login_operator(parent_win):
             password_entry.delete(0, tk.END)
             username_entry.focus_set()
 
-    tk.Button(login_win, text="Login", command=try_login).pack(pady=20)
+    def on_error(e):
+        login_btn.config(state="normal")
+        messagebox.showerror("Database Error", f"Could not check login: {e}")
+
+    def try_login(event=None):
+        if login_btn.cget("state") == "disabled":
+            return
+        username = username_entry.get().strip()
+        password = password_entry.get().strip()
+        login_btn.config(state="disabled")
+        get_worker().submit(
+            login_win,
+            validate_operator,
+            username,
+            password,
+            on_done=lambda valid: on_checked(username, valid),
+            on_error=on_error,
+        )
+
+    login_btn = tk.Button(login_win, text="Login", command=try_login)
+    login_btn.pack(pady=20)
     login_win.bind("<Return>", try_login)
     login_win.wait_window()
 
@@ -148,6 +221,10 @@ def open_admin_dashboard():
     tk.Button(admin_win, text="📝 Add New Entry", width=25, command=add_new_entry).pack(
         pady=10
     )
+    if current_user == "admin":
+        import_btn = tk.Button(admin_win, text="📥 Import Entries", width=25)
+        import_btn.config(command=lambda: import_entries(import_btn))
+        import_btn.pack(pady=10)
     tk.Button(admin_win, text="📄 View Entries", width=25, command=view_entries).pack(
         pady=10
     )
@@ -160,6 +237,15 @@ def open_admin_dashboard():
         width=25,
         command=lambda: view_rework_logs(admin_win),
     ).pack(pady=10)
+    tk.Button(
+        admin_win, text="🔎 Search History", width=25, command=search_history_window
+    ).pack(pady=10)
+    tk.Button(
+        admin_win, text="📊 Defect Pareto", width=25, command=defect_pareto_window
+    ).pack(pady=10)
+    tk.Button(
+        admin_win, text="📈 KPI Dashboard", width=25, command=kpi_dashboard_window
+    ).pack(pady=10)
 
     if current_user == "admin":
         tk.Button(
@@ -169,13 +255,9 @@ def open_admin_dashboard():
             admin_win, text="📋 View Operator List", width=25, command=view_operators
         ).pack(pady=10)
         # Add the new button here
-        tk.Button(
-            admin_win,
-            text="🚨 Clear All Data",
-            width=25,
-            fg="red",
-            command=clear_all_data,
-        ).pack(pady=10)
+        clear_btn = tk.Button(admin_win, text="🚨 Clear All Data", width=25, fg="red")
+        clear_btn.config(command=lambda: clear_all_data(clear_btn))
+        clear_btn.pack(pady=10)
 
     tk.Button(
         admin_win,
@@ -184,9 +266,42 @@ def open_admin_dashboard():
         fg="red",
         command=lambda: logout(admin_win),
     ).pack(pady=20)
+    if current_user == "admin":
+        # Not on the menu: a support tool for chasing slow screens.
+        admin_win.bind("<Control-Shift-Q>", lambda e: query_stats_window())
     admin_win.mainloop()
 
 
+def date_filter_bar(parent, on_change):
+    """Packs Range and Shift dropdowns into parent.
+
+    on_change(filters) is called with date_filter()'s keyword arguments when
+    either changes; the returned function gives the current ones.
+    """
+    frame = tk.Frame(parent)
+    frame.pack(pady=5)
+
+    tk.Label(frame, text="Range:").pack(side="left")
+    range_var = tk.StringVar(value=ALL)
+    ttk.Combobox(
+        frame, textvariable=range_var, values=RANGE_PRESETS, state="readonly", width=14
+    ).pack(side="left", padx=5)
+
+    tk.Label(frame, text="Shift:").pack(side="left")
+    shift_var = tk.StringVar(value=ALL)
+    ttk.Combobox(
+        frame, textvariable=shift_var, values=SHIFT_NAMES, state="readonly", width=10
+    ).pack(side="left", padx=5)
+
+    def current_filters():
+        # Resolved on every call so "Current Shift" etc. follow the clock.
+        return date_filter(range_var.get(), shift_var.get())
+
+    for var in (range_var, shift_var):
+        var.trace_add("write", lambda *args: on_change(current_filters()))
+    return current_filters
+
+
 def view_entries():
     entries_win = tk.Toplevel()
     entries_win.title("All Entries")
@@ -207,6 +322,8 @@ def view_entries():
     )
     title_label.pack(pady=10)
 
+    date_filter_bar(entries_win, lambda filters: table.set_filters(**filters))
+
     columns = (
         "Sr No",
         "PCB ID",
@@ -215,36 +332,10 @@ def view_entries():
         "Rejection Stage",
         "Rejection Details",
     )
-    tree = ttk.Treeview(entries_win, columns=columns, show="headings", height=15)
-
-    for col in columns:
-        tree.heading(col, text=col)
-        tree.column(col, width=130, anchor="center")
-    tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
-
-    # Add scrollbar
-    scrollbar = ttk.Scrollbar(entries_win, orient="vertical", command=tree.yview)
-    tree.configure(yscroll=scrollbar.set)
-    scrollbar.pack(side="right", fill="y")
-
-    try:
-        conn, cursor = get_conn_and_cursor()
-        if conn and cursor:
-            cursor.execute(
-                """
-                SELECT sr_no, pcb_id, model, timestamp, 
-                       COALESCE(rejection_stage, ''), 
-                       COALESCE(rejection_details, '') 
-                FROM entries
-            """
-            )
-            rows = cursor.fetchall()
-            conn.close()
-
-            for row in rows:
-                tree.insert("", "end", values=row)
-    except Exception as e:
-        messagebox.showerror("Database Error", f"Could not fetch entries:\n{e}")
+    table = PagedTable(
+        entries_win, columns, fetch_entries_page, count_entries, height=15
+    )
+    table.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
 
 def logout(admin_win):
@@ -253,32 +344,31 @@ def logout(admin_win):
         start_selection_window()
 
 
-def clear_all_data():
+def clear_all_data(button):
     """Clears all data from the entries and rework_log tables."""
     admin_pass = ask_admin_password()
     if not admin_pass:
         return
 
-    if messagebox.askyesno(
+    if not messagebox.askyesno(
         "Confirm Data Deletion",
         "Are you sure you want to delete ALL testing data from the database? This action is irreversible.",
     ):
-        try:
-            conn, cursor = get_conn_and_cursor()
-            if conn and cursor:
-                cursor.execute("DELETE FROM entries")
-                cursor.execute("DELETE FROM rework_log")
-                cursor.execute("DELETE FROM Models")
-                conn.commit()
-                messagebox.showinfo(
-                    "Success",
-                    "All testing data has been cleared from the database & Models.",
-                )
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to clear data: {e}")
-        finally:
-            if conn:
-                conn.close()
+        return
+
+    def on_done(_):
+        button.config(state="normal")
+        messagebox.showinfo(
+            "Success",
+            "All testing data has been cleared from the database & Models.",
+        )
+
+    def on_error(e):
+        button.config(state="normal")
+        messagebox.showerror("Error", f"Failed to clear data: {e}")
+
+    button.config(state="disabled")
+    get_worker().submit(button, delete_all_data, on_done=on_done, on_error=on_error)
 
 
 def add_new_model():
@@ -292,14 +382,9 @@ def add_new_model():
     entry_model.pack()
     model_win.after(100, lambda: entry_model.focus_set())
 
-    def submit_model(event=None):
-        model_name = entry_model.get().strip()
-        if not model_name:
-            messagebox.showwarning("Input Error", "Model name cannot be empty.")
-            entry_model.focus_set()
-            return
-
-        success, message = insert_model(model_name)
+    def on_saved(model_name, result):
+        submit_btn.config(state="normal")
+        success, message = result
         if success:
             messagebox.showinfo("Success", f"Model '{model_name}' added successfully.")
             model_win.destroy()
@@ -308,14 +393,35 @@ def add_new_model():
             entry_model.delete(0, tk.END)
             entry_model.focus_set()
 
+    def on_error(e):
+        submit_btn.config(state="normal")
+        messagebox.showerror("Database Error", f"Failed to add model:\n{e}")
+
+    def submit_model(event=None):
+        if submit_btn.cget("state") == "disabled":
+            return
+        model_name = entry_model.get().strip()
+        if not model_name:
+            messagebox.showwarning("Input Error", "Model name cannot be empty.")
+            entry_model.focus_set()
+            return
+
+        submit_btn.config(state="disabled")
+        get_worker().submit(
+            model_win,
+            insert_model,
+            model_name,
+            on_done=lambda result: on_saved(model_name, result),
+            on_error=on_error,
+        )
+
     def cancel():
         model_win.destroy()
 
     btn_frame = tk.Frame(model_win)
     btn_frame.pack(pady=15)
-    tk.Button(btn_frame, text="Submit", command=submit_model, width=10).pack(
-        side="left", padx=10
-    )
+    submit_btn = tk.Button(btn_frame, text="Submit", command=submit_model, width=10)
+    submit_btn.pack(side="left", padx=10)
     tk.Button(btn_frame, text="Cancel", command=cancel, width=10).pack(
         side="right", padx=10
     )
@@ -328,9 +434,7 @@ def add_new_entry():
     center_window(entry_win, 400, 450)
     entry_win.resizable(False, False)
 
-    models = get_all_models()
-    model_list = [row[0] for row in models]
-    model_list.insert(0, "--Select Model--")
+    model_list = ["--Select Model--"]
 
     reasons = [
         "COMPONENT DAMAGE",
@@ -365,6 +469,13 @@ def add_new_entry():
         entry_win, textvariable=model_var, values=model_list, state="readonly", width=35
     )
     model_dropdown.pack()
+    get_worker().submit(
+        entry_win,
+        get_all_models,
+        on_done=lambda models: model_dropdown.config(
+            values=model_list + [row[0] for row in models]
+        ),
+    )
 
     tk.Label(entry_win, text="Rejection Stage:").pack(pady=(10, 0))
     entry_stage = tk.Entry(entry_win, width=40)
@@ -379,6 +490,8 @@ def add_new_entry():
     reason_dropdown.pack()
 
     def submit_entry(event=None):
+        if submit_btn.cget("state") == "disabled":
+            return
         pcb_id = entry_pcb_id.get().strip()
         model = model_var.get()
         rejection_stage = entry_stage.get().strip()
@@ -402,34 +515,229 @@ def add_new_entry():
             reason_dropdown.focus_set()
             return
 
-        try:
-            insert_entry(pcb_id, model, timestamp, rejection_stage, rejection_details)
+        def on_saved(result):
             messagebox.showinfo("Success", f"New entry for PCB ID '{pcb_id}' added.")
             entry_win.destroy()
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Duplicate Error", "This PCB ID already exists.")
-            entry_pcb_id.focus_set()
-        except Exception as e:
-            messagebox.showerror("Database Error", f"Failed to add entry:\n{e}")
+
+        def on_error(e):
+            submit_btn.config(state="normal")
+            if isinstance(e, sqlite3.IntegrityError):
+                messagebox.showerror("Duplicate Error", "This PCB ID already exists.")
+                entry_pcb_id.focus_set()
+            else:
+                messagebox.showerror("Database Error", f"Failed to add entry:\n{e}")
+
+        submit_btn.config(state="disabled")
+        get_worker().submit(
+            entry_win,
+            insert_entry,
+            pcb_id,
+            model,
+            timestamp,
+            rejection_stage,
+            rejection_details,
+            on_done=on_saved,
+            on_error=on_error,
+        )
 
     def cancel():
         entry_win.destroy()
 
     btn_frame = tk.Frame(entry_win)
     btn_frame.pack(pady=20)
-    tk.Button(btn_frame, text="Submit", command=submit_entry, width=12).pack(
-        side="left", padx=10
-    )
+    submit_btn = tk.Button(btn_frame, text="Submit", command=submit_entry, width=12)
+    submit_btn.pack(side="left", padx=10)
     tk.Button(btn_frame, text="Cancel", command=cancel, width=12).pack(
         side="right", padx=10
     )
+
+    def start_burst_mode():
+        model = model_var.get()
+        rejection_stage = entry_stage.get().strip()
+        rejection_details = reasons_var.get().strip()
+
+        if not model or model == "--Select Model--":
+            messagebox.showwarning("Input Error", "Please select a model.")
+            model_dropdown.focus_set()
+            return
+        if not rejection_stage:
+            messagebox.showwarning("Input Error", "Rejection Stage cannot be empty.")
+            entry_stage.focus_set()
+            return
+        if not rejection_details or rejection_details == "--SELECT REASON--":
+            messagebox.showwarning("Input Error", "Please select a rejection reason.")
+            reason_dropdown.focus_set()
+            return
+
+        entry_win.destroy()
+        scan_burst_entry(model, rejection_stage, rejection_details)
+
+    tk.Button(
+        entry_win, text="⚡ Continuous Scan Mode", command=start_burst_mode
+    ).pack()
     entry_win.bind("<Return>", submit_entry)
 
 
+# Burst scans are committed together once this many are queued, or after
+# BURST_FLUSH_MS, whichever comes first.
+BURST_BATCH_SIZE = 50
+BURST_FLUSH_MS = 1000
+
+
+def scan_burst_entry(model, rejection_stage, rejection_details):
+    """Continuous scan window: model, stage and reason stay fixed and every
+    scanned PCB ID (ending in Enter) is queued and committed in groups."""
+    burst_win = tk.Toplevel()
+    burst_win.title("Continuous Scan Entry")
+    center_window(burst_win, 500, 550)
+
+    tk.Label(burst_win, text=f"Model: {model}", font=("Arial", 11, "bold")).pack(
+        pady=(10, 0)
+    )
+    tk.Label(burst_win, text=f"Rejection Stage: {rejection_stage}").pack()
+    tk.Label(burst_win, text=f"Rejection Details: {rejection_details}").pack()
+
+    tk.Label(burst_win, text="Scan PCB ID:").pack(pady=(10, 0))
+    scan_entry = tk.Entry(burst_win, width=40)
+    scan_entry.pack()
+    scan_entry.focus_set()
+
+    counts_label = tk.Label(burst_win, text="")
+    counts_label.pack(pady=5)
+
+    columns = ("#", "PCB ID", "Status")
+    tree = ttk.Treeview(burst_win, columns=columns, show="headings", height=15)
+    tree.heading("#", text="#")
+    tree.heading("PCB ID", text="PCB ID")
+    tree.heading("Status", text="Status")
+    tree.column("#", width=50, anchor="center")
+    tree.column("PCB ID", width=220, anchor="center")
+    tree.column("Status", width=150, anchor="center")
+    tree.tag_configure("rejected", foreground="red")
+    tree.tag_configure("saved", foreground="green")
+    tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+    queued = []
+    counts = {"saved": 0, "duplicate": 0, "failed": 0}
+    state = {"seq": 0, "in_flight": False, "job": None, "closing": False}
+
+    def update_counts():
+        counts_label.config(
+            text=f"Saved: {counts['saved']}   Duplicates: {counts['duplicate']}   "
+            f"Failed: {counts['failed']}   Queued: {len(queued)}"
+        )
+
+    def set_status(seq, status, tag=""):
+        tree.set(str(seq), "Status", status)
+        tree.item(str(seq), tags=(tag,) if tag else ())
+
+    def on_scan(event=None):
+        pcb_id = scan_entry.get().strip()
+        scan_entry.delete(0, tk.END)
+        if not pcb_id:
+            return
+        state["seq"] += 1
+        seq = state["seq"]
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        queued.append(
+            (seq, pcb_id, model, timestamp, rejection_stage, rejection_details)
+        )
+        tree.insert("", 0, iid=str(seq), values=(seq, pcb_id, "Queued"))
+        update_counts()
+        if len(queued) >= BURST_BATCH_SIZE:
+            flush()
+        elif state["job"] is None:
+            state["job"] = burst_win.after(BURST_FLUSH_MS, flush)
+
+    def flush():
+        if state["job"] is not None:
+            burst_win.after_cancel(state["job"])
+            state["job"] = None
+        if state["in_flight"] or not queued:
+            return
+        batch = queued[:]
+        queued.clear()
+        state["in_flight"] = True
+        for row in batch:
+            set_status(row[0], "Saving…")
+
+        def on_done(result):
+            state["in_flight"] = False
+            rejected = {}
+            for seq, pcb_id in result["duplicates"]:
+                rejected[seq] = ("Duplicate", "duplicate")
+            for seq, reason in result["invalid"]:
+                rejected[seq] = (reason, "failed")
+            for row in batch:
+                status, outcome = rejected.get(row[0], ("Saved", "saved"))
+                set_status(row[0], status, "saved" if outcome == "saved" else "rejected")
+                counts[outcome] += 1
+            after_flush()
+
+        def on_error(e):
+            state["in_flight"] = False
+            for row in batch:
+                set_status(row[0], "Failed", "rejected")
+            counts["failed"] += len(batch)
+            after_flush()
+            messagebox.showerror("Database Error", f"Failed to add entries:\n{e}")
+
+        get_worker().submit(
+            burst_win,
+            insert_entries_bulk,
+            batch,
+            on_done=on_done,
+            on_error=on_error,
+        )
+
+    def after_flush():
+        update_counts()
+        if state["closing"] and not queued:
+            burst_win.destroy()
+        elif queued:
+            flush()
+
+    def close():
+        # Commit whatever is still queued before the window goes away.
+        state["closing"] = True
+        if queued or state["in_flight"]:
+            flush()
+        else:
+            burst_win.destroy()
+
+    update_counts()
+    scan_entry.bind("<Return>", on_scan)
+    tk.Button(burst_win, text="Done", width=12, command=close).pack(pady=10)
+    burst_win.protocol("WM_DELETE_WINDOW", close)
+
+
+def import_entries(button):
+    """Imports rejection entries from a CSV/XLSX file chosen by the admin."""
+    path = filedialog.askopenfilename(
+        title="Import Entries",
+        filetypes=[("CSV or Excel", "*.csv *.xlsx"), ("All files", "*.*")],
+    )
+    if not path:
+        return
+
+    def on_done(result):
+        button.config(state="normal", text="📥 Import Entries")
+        messagebox.showinfo("Import Finished", summarise_import(result))
+
+    def on_error(e):
+        button.config(state="normal", text="📥 Import Entries")
+        messagebox.showerror("Import Failed", str(e))
+
+    button.config(state="disabled", text="Importing…")
+    get_worker().submit(
+        button, import_entries_file, path, on_done=on_done, on_error=on_error
+    )
+
+
 def do_rework():
     rework_win = tk.Toplevel()
     rework_win.title("Do Rework")
-    center_window(rework_win, 600, 600)
+    center_window(rework_win, 600, 680)
     rework_win.grab_set()
     rework_win.focus_force()
 
@@ -447,6 +755,9 @@ def do_rework():
     pcb_entry.pack()
     pcb_entry.focus_set()
 
+    suggestions = tk.Listbox(rework_win, height=4, width=30)
+    suggestions.pack()
+
     tk.Label(rework_win, text="Model:").pack()
     model_entry = tk.Entry(rework_win, state="readonly")
     model_entry.pack()
@@ -471,19 +782,18 @@ def do_rework():
     submit_btn = tk.Button(rework_win, text="Submit")
     submit_btn.pack(pady=10)
 
+    status_label = tk.Label(rework_win, text="", fg="gray")
+    status_label.pack()
+
     tk.Label(rework_win, text="Previous Reworks:").pack()
     previous_rework_text = tk.Text(rework_win, height=8, width=60, state="disabled")
     previous_rework_text.pack(pady=5)
 
     job = None
+    lookup = None
+    completion = None
 
-    def show_previous_reworks(pcbid):
-        try:
-            all_reworks = get_all_reworks_by_pcbid(pcbid)
-        except Exception as e:
-            messagebox.showerror("Database Error", f"Could not fetch reworks: {e}")
-            return
-
+    def show_previous_reworks(all_reworks):
         previous_rework_text.config(state="normal")
         previous_rework_text.delete(1.0, tk.END)
 
@@ -500,6 +810,11 @@ def do_rework():
         previous_rework_text.config(state="disabled")
 
     def run_fetch_details():
+        nonlocal lookup
+        # Only the newest lookup may fill the fields; show_snapshot appends.
+        if lookup:
+            lookup.cancel()
+            lookup = None
         pcbid = pcb_entry.get().strip()
         if not pcbid:
             return
@@ -517,11 +832,25 @@ def do_rework():
         previous_rework_text.delete(1.0, tk.END)
         previous_rework_text.config(state="disabled")
 
-        entry = search_entry_by_pcbid(pcbid)
-        all_reworks = get_all_reworks_by_pcbid(pcbid)
+        status_label.config(text="Loading…")
+        lookup = get_worker().submit(
+            rework_win,
+            get_pcb_snapshot,
+            pcbid,
+            on_done=show_snapshot,
+            on_error=lambda e: [
+                status_label.config(text=""),
+                messagebox.showerror("Database Error", f"Could not fetch PCB: {e}"),
+            ],
+        )
+
+    def show_snapshot(snapshot):
+        status_label.config(text="")
+        entry = snapshot["entry"]
+        all_reworks = snapshot["reworks"]
 
         if entry:
-            _, _, model, timestamp, stage, details = entry[0]
+            _, _, model, timestamp, stage, details = entry
 
             model_entry.config(state="normal")
             model_entry.insert(0, model)
@@ -541,13 +870,13 @@ def do_rework():
 
             submit_btn.config(command=submit)
 
-            show_previous_reworks(pcbid)
+            show_previous_reworks(all_reworks)
 
         elif all_reworks:
             latest_rework = all_reworks[-1]
             rework_no, reason, date, done_by = latest_rework
 
-            show_previous_reworks(pcbid)
+            show_previous_reworks(all_reworks)
 
             model_entry.config(state="normal")
             model_entry.insert(0, "Already Reworked")
@@ -582,11 +911,75 @@ def do_rework():
                 widget.config(state="readonly" if widget != action_entry else "normal")
             submit_btn.config(state="disabled")
 
-    def fetch_details(event=None):
+    def complete(prefix):
+        # Runs on the db worker: in service mode both calls go to the server.
+        return complete_pcb_id(prefix, limit=20) or [], is_known_pcb_id(prefix)
+
+    def show_completion(prefix, result):
         nonlocal job
+        if pcb_entry.get().strip() != prefix:
+            return
+        matches, known = result
+        suggestions.delete(0, tk.END)
+        for pcb_id in matches:
+            suggestions.insert(tk.END, pcb_id)
+        # Only look up hand-typed IDs once they match a known board, so a
+        # partial ID shows suggestions instead of a "not found" error.
+        if known is not False:
+            job = rework_win.after(500, run_fetch_details)
+
+    def fetch_details(event=None):
+        nonlocal job, completion
+        if event is not None and event.keysym in ("Return", "KP_Enter", "Down"):
+            return
         if job:
             rework_win.after_cancel(job)
-        job = rework_win.after(500, run_fetch_details)
+            job = None
+        # A new scan makes any lookup still in flight stale.
+        if lookup:
+            lookup.cancel()
+            status_label.config(text="")
+        if completion:
+            completion.cancel()
+            completion = None
+        prefix = pcb_entry.get().strip()
+        if not prefix:
+            suggestions.delete(0, tk.END)
+            return
+        completion = get_worker().submit(
+            rework_win,
+            complete,
+            prefix,
+            on_done=lambda result: show_completion(prefix, result),
+        )
+
+    def lookup_now(event=None):
+        # Scanners end with Enter: look up straight away, no debounce.
+        nonlocal job, completion
+        if job:
+            rework_win.after_cancel(job)
+            job = None
+        if completion:
+            completion.cancel()
+            completion = None
+        suggestions.delete(0, tk.END)
+        run_fetch_details()
+
+    def pick_suggestion(event=None):
+        selection = suggestions.curselection()
+        if not selection:
+            return
+        pcb_entry.delete(0, tk.END)
+        pcb_entry.insert(0, suggestions.get(selection[0]))
+        pcb_entry.focus_set()
+        lookup_now()
+
+    def focus_suggestions(event=None):
+        if suggestions.size():
+            suggestions.focus_set()
+            suggestions.selection_clear(0, tk.END)
+            suggestions.selection_set(0)
+            suggestions.activate(0)
 
     def submit(event=None):
         pcbid = pcb_entry.get().strip()
@@ -603,58 +996,184 @@ def do_rework():
         global current_user
         user = current_user if current_user else "unknown"
 
-        try:
-            entry = search_entry_by_pcbid(pcbid)
-            if entry:
-                insert_rework(pcbid, rework_action, user)
-                delete_entry_by_pcb_id(pcbid)
-                messagebox.showinfo("✅ Success", f"Rework saved for PCB ID {pcbid}.")
-                rework_win.destroy()
-            else:
-                insert_rework(pcbid, rework_action, user)
-                messagebox.showinfo("✅ Success", f"Rework saved for PCB ID {pcbid}.")
-                fetch_details()
-                rework_win.destroy()
+        def on_saved(snapshot):
+            messagebox.showinfo("✅ Success", f"Rework saved for PCB ID {pcbid}.")
+            rework_win.destroy()
 
-        except Exception as e:
+        def on_failed(e):
+            status_label.config(text="")
+            submit_btn.config(state="normal")
             messagebox.showerror("Database Error", f"Insert failed: {e}")
 
+        submit_btn.config(state="disabled")
+        status_label.config(text="Saving…")
+        get_worker().submit(
+            rework_win,
+            submit_rework,
+            pcbid,
+            rework_action,
+            user,
+            on_done=on_saved,
+            on_error=on_failed,
+        )
+
     pcb_entry.bind("<KeyRelease>", fetch_details)
+    pcb_entry.bind("<Return>", lookup_now)
+    pcb_entry.bind("<KP_Enter>", lookup_now)
+    pcb_entry.bind("<Down>", focus_suggestions)
+    suggestions.bind("<Double-Button-1>", pick_suggestion)
+    suggestions.bind("<Return>", pick_suggestion)
     submit_btn.config(command=submit)
 
+    def refresh_stale_index():
+        age = pcb_index_age()
+        if age is None or age > PCB_INDEX_MAX_AGE:
+            refresh_pcb_index()
 
-def take_backup():
-    try:
-        # ensure main backup folder exists
-        backup_root = "backups"
-        os.makedirs(backup_root, exist_ok=True)
-
-        # create datewise folder (YYYY-MM-DD)
-        today_str = datetime.datetime.now().strftime("%Y-%m-%d")
-        backup_dir = os.path.join(backup_root, today_str)
-        os.makedirs(backup_dir, exist_ok=True)
-
-        # fetch data from DB
-        conn = get_connection()
-        df = pd.read_sql_query("SELECT * FROM rework_log", conn)
-        conn.close()
-
-        # filename with timestamp inside datewise folder
-        filename = os.path.join(
-            backup_dir,
-            f"backup_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-        )
+    get_worker().submit(rework_win, refresh_stale_index)
+
+
+def _run_backup_job(button, job, describe):
+    """Runs job on the backup worker so the UI stays responsive.
 
-        # save to Excel
-        df.to_excel(filename, index=False)
+    describe(result) returns the success message.
+    """
+    label = button.cget("text")
 
+    def on_done(result):
+        button.config(state="normal", text=label)
         # success popup
-        messagebox.showinfo("✅ Backup Success", f"Backup saved:\n{filename}")
+        messagebox.showinfo("✅ Backup Success", describe(result))
 
-    except Exception as e:
+    def on_error(e):
+        button.config(state="normal", text=label)
         # error popup
         messagebox.showerror("❌ Backup Failed", str(e))
 
+    button.config(state="disabled", text="Backing up…")
+    get_worker("backup").submit(button, job, on_done=on_done, on_error=on_error)
+
+
+def take_backup(button, filters=None):
+    _run_backup_job(
+        button,
+        lambda: write_backup(**(filters or {})),
+        lambda filename: f"Backup saved:\n{filename}",
+    )
+
+
+def take_incremental_backup(button):
+    def describe(record):
+        if record is None:
+            return "Nothing new since the last incremental backup."
+        return "Incremental backup saved:\n" + "\n".join(
+            f"{table}: {part['rows']} new rows"
+            for table, part in record["tables"].items()
+        )
+
+    _run_backup_job(button, write_incremental_backup, describe)
+
+
+def take_snapshot_backup(button):
+    _run_backup_job(
+        button, write_snapshot_backup, lambda path: f"Database snapshot saved:\n{path}"
+    )
+
+
+def archive_old_data(button):
+    days = simpledialog.askinteger(
+        "Archive Old Data",
+        "Move rework logs older than how many days\n"
+        "into the monthly archive files?",
+        initialvalue=ARCHIVE_AFTER_DAYS,
+        minvalue=1,
+    )
+    if days is None:
+        return
+    label = button.cget("text")
+
+    def on_done(moved):
+        button.config(state="normal", text=label)
+        if not moved:
+            messagebox.showinfo("Archive", f"Nothing older than {days} days.")
+            return
+        messagebox.showinfo(
+            "✅ Archive Done",
+            "\n".join(
+                f"{month}: {counts['rework_log']} rework logs"
+                for month, counts in moved.items()
+            ),
+        )
+
+    def on_error(e):
+        button.config(state="normal", text=label)
+        messagebox.showerror("❌ Archive Failed", str(e))
+
+    button.config(state="disabled", text="Archiving…")
+    get_worker("backup").submit(
+        button, archive_old_rows, days, on_done=on_done, on_error=on_error
+    )
+
+
+def export_data(filters):
+    """Asks for a view, format and model, then exports with the date filters."""
+    export_win = tk.Toplevel()
+    export_win.title("Export Data")
+    center_window(export_win, 360, 260)
+    export_win.grab_set()
+
+    form = tk.Frame(export_win)
+    form.pack(pady=15)
+    view_var = tk.StringVar(value="traceability")
+    format_var = tk.StringVar(value="csv")
+    model_var = tk.StringVar(value="All")
+    fields = (
+        ("View:", view_var, sorted(export.VIEWS)),
+        ("Format:", format_var, list(export.FORMATS)),
+        ("Model:", model_var, ["All"]),
+    )
+    boxes = []
+    for row, (label, var, values) in enumerate(fields):
+        tk.Label(form, text=label).grid(row=row, column=0, sticky="e", pady=5)
+        box = ttk.Combobox(
+            form, textvariable=var, values=values, state="readonly", width=18
+        )
+        box.grid(row=row, column=1, padx=5, pady=5)
+        boxes.append(box)
+    model_box = boxes[-1]
+
+    def show_models(models):
+        model_box.config(values=["All"] + [row[0] for row in models])
+
+    def run_export():
+        model = model_var.get()
+        export_btn.config(state="disabled", text="Exporting…")
+
+        def on_done(result):
+            export_win.destroy()
+            messagebox.showinfo(
+                "✅ Export Done", f"{result['rows']} rows saved:\n{result['file']}"
+            )
+
+        def on_error(e):
+            export_btn.config(state="normal", text="📤 Export")
+            messagebox.showerror("❌ Export Failed", str(e), parent=export_win)
+
+        get_worker("backup").submit(
+            export_win,
+            export.write_export,
+            view_var.get(),
+            format_var.get(),
+            model=None if model == "All" else model,
+            on_done=on_done,
+            on_error=on_error,
+            **filters,
+        )
+
+    export_btn = tk.Button(export_win, text="📤 Export", width=20, command=run_export)
+    export_btn.pack(pady=10)
+    get_worker().submit(export_win, get_all_models, on_done=show_models)
+
 
 def db_add_operator():
     operator_win = tk.Toplevel()
@@ -680,6 +1199,8 @@ def db_add_operator():
     password_entry.pack()
 
     def save_operator(event=None):
+        if add_btn.cget("state") == "disabled":
+            return
         username = username_entry.get().strip()
         password = password_entry.get().strip()
 
@@ -689,16 +1210,33 @@ def db_add_operator():
             username_entry.focus_set()
             return
 
-        if add_operator(username, password):
-            messagebox.showinfo("Success", "Operator added")
-            operator_win.destroy()
-        else:
-            messagebox.showerror("Error", "Username already exists")
-            username_entry.delete(0, tk.END)
-            password_entry.delete(0, tk.END)
-            username_entry.focus_set()
+        def on_saved(added):
+            add_btn.config(state="normal")
+            if added:
+                messagebox.showinfo("Success", "Operator added")
+                operator_win.destroy()
+            else:
+                messagebox.showerror("Error", "Username already exists")
+                username_entry.delete(0, tk.END)
+                password_entry.delete(0, tk.END)
+                username_entry.focus_set()
+
+        def on_error(e):
+            add_btn.config(state="normal")
+            messagebox.showerror("Database Error", f"Failed to add operator:\n{e}")
+
+        add_btn.config(state="disabled")
+        get_worker().submit(
+            operator_win,
+            add_operator,
+            username,
+            password,
+            on_done=on_saved,
+            on_error=on_error,
+        )
 
-    tk.Button(operator_win, text="Add", command=save_operator).pack(pady=10)
+    add_btn = tk.Button(operator_win, text="Add", command=save_operator)
+    add_btn.pack(pady=10)
     operator_win.bind("<Return>", save_operator)
 
 
@@ -716,9 +1254,9 @@ def ask_admin_password():
 
     result = {"password": None}
 
-    def on_submit():
-        entered_password = password_entry.get()
-        if validate_admin("admin", entered_password):
+    def on_checked(entered_password, valid):
+        submit_btn.config(state="normal")
+        if valid:
             result["password"] = entered_password
             dialog.destroy()
         else:
@@ -726,10 +1264,29 @@ def ask_admin_password():
             password_entry.delete(0, tk.END)
             password_entry.focus_set()
 
+    def on_error(e):
+        submit_btn.config(state="normal")
+        messagebox.showerror("Database Error", f"Could not check password: {e}")
+
+    def on_submit():
+        if submit_btn.cget("state") == "disabled":
+            return
+        entered_password = password_entry.get()
+        submit_btn.config(state="disabled")
+        get_worker().submit(
+            dialog,
+            validate_admin,
+            "admin",
+            entered_password,
+            on_done=lambda valid: on_checked(entered_password, valid),
+            on_error=on_error,
+        )
+
     def on_cancel():
         dialog.destroy()
 
-    tk.Button(dialog, text="Submit", width=10, command=on_submit).pack(pady=10)
+    submit_btn = tk.Button(dialog, text="Submit", width=10, command=on_submit)
+    submit_btn.pack(pady=10)
     tk.Button(dialog, text="Cancel", width=10, command=on_cancel).pack()
 
     dialog.bind("<Return>", lambda e: on_submit())
@@ -770,9 +1327,18 @@ def view_operators():
     tree.column("password", width=200, anchor="center")
     tree.pack(padx=20, pady=10, fill="both", expand=True)
 
-    operators = list_all_operators()
-    for op in operators:
-        tree.insert("", "end", values=op)
+    def show_operators(operators):
+        for op in operators:
+            tree.insert("", "end", values=op)
+
+    get_worker().submit(
+        operators_win,
+        list_all_operators,
+        on_done=show_operators,
+        on_error=lambda e: messagebox.showerror(
+            "Error", f"Could not list operators: {e}", parent=operators_win
+        ),
+    )
 
     scrollbar = ttk.Scrollbar(operators_win, orient="vertical", command=tree.yview)
     tree.configure(yscroll=scrollbar.set)
@@ -798,6 +1364,10 @@ def view_rework_logs(admin_window):
     # Title
     tk.Label(logs_win, text="Rework Logs", font=("Arial", 16, "bold")).pack(pady=10)
 
+    current_filters = date_filter_bar(
+        logs_win, lambda filters: table.set_filters(**filters)
+    )
+
     # Treeview
     columns = (
         "id",
@@ -807,43 +1377,414 @@ def view_rework_logs(admin_window):
         "rework_date",
         "rework_done_by",
     )
-    tree = ttk.Treeview(logs_win, columns=columns, show="headings")
+    table = PagedTable(
+        logs_win,
+        columns,
+        fetch_rework_log_page,
+        count_rework_logs,
+        headings=[col.replace("_", " ").title() for col in columns],
+    )
+    table.pack(fill="both", expand=True)
+
+    if current_user == "admin":
+        backup_btn = tk.Button(logs_win, text="💾 Take Backup", width=25)
+        backup_btn.config(command=lambda: take_backup(backup_btn, current_filters()))
+        backup_btn.pack(pady=10)
+        incremental_btn = tk.Button(logs_win, text="🧩 Incremental Backup", width=25)
+        incremental_btn.config(command=lambda: take_incremental_backup(incremental_btn))
+        incremental_btn.pack()
+        snapshot_btn = tk.Button(logs_win, text="🗄 Database Snapshot", width=25)
+        snapshot_btn.config(command=lambda: take_snapshot_backup(snapshot_btn))
+        snapshot_btn.pack(pady=10)
+        archive_btn = tk.Button(logs_win, text="🗃 Archive Old Data", width=25)
+        archive_btn.config(command=lambda: archive_old_data(archive_btn))
+        archive_btn.pack()
+        tk.Button(
+            logs_win,
+            text="📤 Export CSV/Parquet",
+            width=25,
+            command=lambda: export_data(current_filters()),
+        ).pack(pady=10)
+
+
+def search_history_window():
+    search_win = tk.Toplevel()
+    search_win.title("Search History")
+    center_window(search_win, 900, 500)
+
+    tk.Button(
+        search_win,
+        text="← Back",
+        command=search_win.destroy,
+        relief="flat",
+        fg="blue",
+        cursor="hand2",
+    ).pack(anchor="nw", padx=10, pady=10)
+
+    tk.Label(
+        search_win,
+        text="Search rework actions and rejection details (e.g. bridge U12):",
+    ).pack()
+    search_frame = tk.Frame(search_win)
+    search_frame.pack(pady=5)
+    query_entry = tk.Entry(search_frame, width=50)
+    query_entry.pack(side="left", padx=5)
+    query_entry.focus_set()
+
+    status_label = tk.Label(search_win, text="", fg="gray")
+    status_label.pack()
+
+    columns = ("Type", "PCB ID", "Date", "Details", "Stage / Done By")
+    tree = ttk.Treeview(search_win, columns=columns, show="headings")
+    for col in columns:
+        tree.heading(col, text=col)
+        tree.column(col, width=150, anchor="center")
+    tree.column("Details", width=300, anchor="w")
+    tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+    pending = None
+
+    def show_results(rows):
+        tree.delete(*tree.get_children())
+        for row in rows:
+            tree.insert("", "end", values=row)
+        status_label.config(text=f"{len(rows)} matches")
+
+    def run_search(event=None):
+        nonlocal pending
+        text = query_entry.get().strip()
+        if not text:
+            return
+        if pending:
+            pending.cancel()
+        status_label.config(text="Searching…")
+        pending = get_worker().submit(
+            search_win,
+            search_history,
+            text,
+            on_done=show_results,
+            on_error=lambda e: [
+                status_label.config(text=""),
+                messagebox.showerror("Search Error", str(e)),
+            ],
+        )
+
+    tk.Button(search_frame, text="Search", command=run_search).pack(side="left")
+    query_entry.bind("<Return>", run_search)
+
+
+PARETO_RANGES = {
+    "Today": 0,
+    "Last 7 Days": 6,
+    "Last 30 Days": 29,
+    "Last 90 Days": 89,
+    "Last 365 Days": 364,
+}
+
+
+def defect_pareto_window():
+    pareto_win = tk.Toplevel()
+    pareto_win.title("Defect Pareto")
+    center_window(pareto_win, 800, 520)
+
+    tk.Button(
+        pareto_win,
+        text="← Back",
+        command=pareto_win.destroy,
+        relief="flat",
+        fg="blue",
+        cursor="hand2",
+    ).pack(anchor="nw", padx=10, pady=10)
+
+    filter_frame = tk.Frame(pareto_win)
+    filter_frame.pack(pady=5)
+
+    tk.Label(filter_frame, text="Range:").pack(side="left")
+    range_var = tk.StringVar(value="Last 7 Days")
+    ttk.Combobox(
+        filter_frame,
+        textvariable=range_var,
+        values=list(PARETO_RANGES),
+        state="readonly",
+        width=14,
+    ).pack(side="left", padx=5)
+
+    tk.Label(filter_frame, text="Model:").pack(side="left")
+    model_var = tk.StringVar(value="All")
+    model_box = ttk.Combobox(
+        filter_frame, textvariable=model_var, state="readonly", width=18
+    )
+    model_box.pack(side="left", padx=5)
+
+    tk.Label(filter_frame, text="Stage:").pack(side="left")
+    stage_var = tk.StringVar(value="All")
+    stage_box = ttk.Combobox(
+        filter_frame, textvariable=stage_var, state="readonly", width=14
+    )
+    stage_box.pack(side="left", padx=5)
+
+    status_label = tk.Label(pareto_win, text="", fg="gray")
+    status_label.pack()
+
+    columns = ("Reason", "Defects", "%", "Cum %", "")
+    tree = ttk.Treeview(pareto_win, columns=columns, show="headings")
+    for col, width, anchor in (
+        ("Reason", 220, "w"),
+        ("Defects", 80, "center"),
+        ("%", 60, "center"),
+        ("Cum %", 70, "center"),
+        ("", 300, "w"),
+    ):
+        tree.heading(col, text=col)
+        tree.column(col, width=width, anchor=anchor)
+    tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+    def load_filters():
+        return [row[0] for row in get_all_models()], get_rollup_stages()
+
+    def show_filters(result):
+        models, stages = result
+        model_box.config(values=["All"] + models)
+        stage_box.config(values=["All"] + stages)
+
+    def show_pareto(rows):
+        tree.delete(*tree.get_children())
+        top = rows[0][1] if rows else 1
+        for reason, defects, percent, cumulative in rows:
+            bar = "█" * max(1, round(30 * defects / top))
+            tree.insert("", "end", values=(reason, defects, percent, cumulative, bar))
+        total = sum(row[1] for row in rows)
+        status_label.config(text=f"{total} defects in top reasons")
+
+    def refresh(event=None):
+        today = datetime.date.today()
+        date_from = today - datetime.timedelta(days=PARETO_RANGES[range_var.get()])
+        model = model_var.get()
+        stage = stage_var.get()
+        status_label.config(text="Loading…")
+        get_worker().submit(
+            pareto_win,
+            get_defect_pareto,
+            date_from.isoformat(),
+            today.isoformat(),
+            model=None if model == "All" else model,
+            stage=None if stage == "All" else stage,
+            on_done=show_pareto,
+        )
+
+    for box_var in (range_var, model_var, stage_var):
+        box_var.trace_add("write", lambda *args: refresh())
+    get_worker().submit(pareto_win, load_filters, on_done=show_filters)
+    refresh()
+
+
+def kpi_dashboard_window():
+    kpi_win = tk.Toplevel()
+    kpi_win.title("KPI Dashboard")
+    center_window(kpi_win, 860, 520)
+
+    tk.Button(
+        kpi_win,
+        text="← Back",
+        command=kpi_win.destroy,
+        relief="flat",
+        fg="blue",
+        cursor="hand2",
+    ).pack(anchor="nw", padx=10, pady=10)
+
+    filter_frame = tk.Frame(kpi_win)
+    filter_frame.pack(pady=5)
+
+    tk.Label(filter_frame, text="Range:").pack(side="left")
+    range_var = tk.StringVar(value="Last 7 Days")
+    ttk.Combobox(
+        filter_frame,
+        textvariable=range_var,
+        values=list(PARETO_RANGES),
+        state="readonly",
+        width=14,
+    ).pack(side="left", padx=5)
+
+    tk.Label(filter_frame, text="Model:").pack(side="left")
+    model_var = tk.StringVar(value="All")
+    model_box = ttk.Combobox(
+        filter_frame, textvariable=model_var, state="readonly", width=18
+    )
+    model_box.pack(side="left", padx=5)
 
+    totals_label = tk.Label(kpi_win, text="", font=("Arial", 11))
+    totals_label.pack(pady=5)
+
+    columns = (
+        "Day",
+        "Model",
+        "Rejected",
+        "Reworked",
+        "Reworked >1",
+        "Rework FPY %",
+        "Backlog",
+    )
+    tree = ttk.Treeview(kpi_win, columns=columns, show="headings")
     for col in columns:
-        tree.heading(col, text=col.replace("_", " ").title())
-        tree.column(col, width=130, anchor="center")
+        tree.heading(col, text=col)
+        tree.column(col, width=115, anchor="center")
+    tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+    def show_models(models):
+        model_box.config(values=["All"] + [row[0] for row in models])
+
+    def show_summary(rows):
+        tree.delete(*tree.get_children())
+        for row in rows:
+            tree.insert("", "end", values=["-" if v is None else v for v in row])
+        rejected = sum(row[2] for row in rows)
+        reworked = sum(row[3] for row in rows)
+        multi = sum(row[4] for row in rows)
+        fpy = f"{100 * (reworked - multi) / reworked:.1f}%" if reworked else "-"
+        totals_label.config(
+            text=f"Rejected: {rejected}   Reworked: {reworked}   "
+            f"Reworked more than once: {multi}   Rework FPY: {fpy}"
+        )
 
-    tree.pack(fill="both", expand=True)
+    def refresh(event=None):
+        date_from = datetime.date.today() - datetime.timedelta(
+            days=PARETO_RANGES[range_var.get()]
+        )
+        model = model_var.get()
+        totals_label.config(text="Loading…")
+        get_worker().submit(
+            kpi_win,
+            get_kpi_summary,
+            date_from.isoformat(),
+            model=None if model == "All" else model,
+            on_done=show_summary,
+        )
 
-    # Load data from DB
-    def load_data():
-        try:
-            conn, cur = get_conn_and_cursor()
-            if conn and cur:
-                cur.execute(
-                    "SELECT id, pcb_id, rework_no, rework_action, rework_date, rework_done_by FROM rework_log"
-                )
-                rows = cur.fetchall()
-                conn.close()
+    tk.Button(filter_frame, text="Refresh", command=refresh).pack(side="left", padx=5)
+    for box_var in (range_var, model_var):
+        box_var.trace_add("write", lambda *args: refresh())
+    get_worker().submit(kpi_win, get_all_models, on_done=show_models)
+    refresh()
 
-                for row in rows:
-                    tree.insert("", "end", values=row)
-        except Exception as e:
-            messagebox.showerror("Database Error", f"Could not load data:\n{e}")
 
-    load_data()
+def query_stats_window():
+    stats_win = tk.Toplevel()
+    stats_win.title("Query Stats")
+    center_window(stats_win, 980, 560)
 
-    if current_user == "admin":
-        tk.Button(logs_win, text="💾 Take Backup", width=25, command=take_backup).pack(
-            pady=10
+    tk.Button(
+        stats_win,
+        text="← Back",
+        command=stats_win.destroy,
+        relief="flat",
+        fg="blue",
+        cursor="hand2",
+    ).pack(anchor="nw", padx=10, pady=10)
+
+    # In service mode the database calls run on the server, so show its stats.
+    source = "server" if service_client else "this station"
+    summary_label = tk.Label(stats_win, text="", font=("Arial", 10))
+    summary_label.pack(pady=5)
+
+    columns = (
+        "Kind",
+        "Call / Statement",
+        "Calls",
+        "Mean ms",
+        "p50 ms",
+        "p95 ms",
+        "p99 ms",
+        "Max ms",
+        "Slow",
+    )
+    tree = ttk.Treeview(stats_win, columns=columns, show="headings")
+    for col in columns:
+        tree.heading(col, text=col)
+        tree.column(col, width=70, anchor="center")
+    tree.column("Call / Statement", width=420, anchor="w")
+    tree.pack(fill="both", expand=True, padx=10, pady=10)
+
+    last_report = {}
+
+    def load_report():
+        return service_client.stats() if service_client else query_stats.report()
+
+    def show_report(report):
+        last_report.clear()
+        last_report.update(report)
+        tree.delete(*tree.get_children())
+        for row in report["stats"]:
+            tree.insert(
+                "",
+                "end",
+                values=(
+                    row["kind"],
+                    row["name"],
+                    row["calls"],
+                    row["mean_ms"],
+                    row["p50_ms"],
+                    row["p95_ms"],
+                    row["p99_ms"],
+                    row["max_ms"],
+                    row["slow"],
+                ),
+            )
+        summary_label.config(
+            text=f"Timings on {source} since {report['since']} — calls over "
+            f"{report['slow_call_ms']:g} ms go to the slow query log"
         )
 
+    def refresh():
+        try:
+            show_report(load_report())
+        except Exception as e:
+            messagebox.showerror("Query Stats", f"Could not load stats: {e}")
+
+    def dump_to_file():
+        path = filedialog.asksaveasfilename(
+            parent=stats_win,
+            defaultextension=".json",
+            initialfile="query_stats.json",
+            filetypes=[("JSON", "*.json")],
+        )
+        if path:
+            query_stats.dump(path, last_report or None)
+            messagebox.showinfo("Query Stats", f"Saved to {path}")
+
+    def reset():
+        query_stats.reset()
+        refresh()
+
+    button_frame = tk.Frame(stats_win)
+    button_frame.pack(pady=5)
+    tk.Button(button_frame, text="Refresh", width=12, command=refresh).pack(
+        side="left", padx=5
+    )
+    tk.Button(button_frame, text="Dump to File…", width=12, command=dump_to_file).pack(
+        side="left", padx=5
+    )
+    if not service_client:
+        tk.Button(button_frame, text="Reset", width=12, command=reset).pack(
+            side="left", padx=5
+        )
+    refresh()
+
 
 def start_selection_window():
     selection_win = tk.Tk()
     selection_win.title("Rework System")
     center_window(selection_win, 600, 500)
 
+    # Create/migrate the database once the window is up instead of before it;
+    # init_db is a no-op after the first run.
+    selection_win.after_idle(lambda: get_worker().submit(selection_win, init_db))
+    if os.environ.get("REWORK_STARTUP_TIMING"):
+        selection_win.after_idle(
+            lambda: print(
+                f"Startup: first window after {time.perf_counter() - _STARTED_AT:.3f}s"
+            )
+        )
+
     tk.Label(selection_win, text="Login as:", font=("Arial", 12)).pack(pady=10)
 
     tk.Button(
@@ -10,7 +10,7 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=['IPython', 'jupyter', 'notebook'],
+    excludes=['IPython', 'jupyter', 'notebook', 'pandas', 'numpy'],
     noarchive=False,
     optimize=0,
 )
@@ -0,0 +1,177 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from db_handler import PAGE_SIZE
+from db_worker import get_worker
+
+# Fetch another page when the view is within this fraction of either end.
+EDGE_FRACTION = 0.1
+
+
+class PagedTable(tk.Frame):
+    """A Treeview that loads rows page by page, by key, as the user scrolls.
+
+    fetch_page(after=None, before=None, limit=n) must return rows in
+    ascending key order with the integer key in column 0; count_rows()
+    returns the total shown under the table. Both also receive the keyword
+    arguments given to set_filters(). At most max_rows rows are kept
+    in the Treeview: rows scrolled far out of view are dropped and fetched
+    again if the user scrolls back to them.
+    """
+
+    def __init__(
+        self,
+        parent,
+        columns,
+        fetch_page,
+        count_rows,
+        headings=None,
+        page_size=PAGE_SIZE,
+        max_rows=1000,
+        height=15,
+        column_width=130,
+    ):
+        super().__init__(parent)
+        self.fetch_page = fetch_page
+        self.count_rows = count_rows
+        self.page_size = page_size
+        self.max_rows = max(max_rows, 2 * page_size)
+        self.filters = {}
+
+        self.status_label = tk.Label(self, text="Loading…", fg="gray")
+        self.status_label.pack(side="bottom", anchor="w")
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", height=height)
+        for col, heading in zip(columns, headings or columns):
+            self.tree.heading(col, text=heading)
+            self.tree.column(col, width=column_width, anchor="center")
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+
+        self._total = None
+        self._request = None
+        self._count_request = None
+        self.reload()
+
+    def set_filters(self, **filters):
+        """Replaces the filter arguments and reloads from the first page."""
+        self.filters = filters
+        self.reload()
+
+    def reload(self):
+        """Drops every loaded row and starts again from the first page."""
+        for request in (self._request, self._count_request):
+            if request:
+                request.cancel()
+        self.tree.delete(*self.tree.get_children())
+        self._first_key = None
+        self._last_key = None
+        self._at_start = True
+        self._at_end = False
+        self._total = None
+        self._request = None
+        self._fetch(self._append, after=None)
+        self._count_request = get_worker().submit(
+            self,
+            self.count_rows,
+            **self.filters,
+            on_done=self._show_total,
+            on_error=lambda e: self._show_total(None),
+        )
+
+    def _fetch(self, on_done, **bounds):
+        self.status_label.config(text="Loading…")
+        self._request = get_worker().submit(
+            self,
+            self.fetch_page,
+            limit=self.page_size,
+            on_done=on_done,
+            on_error=self._show_error,
+            **bounds,
+            **self.filters,
+        )
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._request is not None:
+            return
+        if float(last) >= 1 - EDGE_FRACTION and not self._at_end:
+            self._fetch(self._append, after=self._last_key)
+        elif float(first) <= EDGE_FRACTION and not self._at_start:
+            self._fetch(self._prepend, before=self._first_key)
+
+    def _append(self, rows):
+        self._request = None
+        self._at_end = len(rows) < self.page_size
+        self._update_status()
+        if not rows:
+            return
+
+        top = self._top_index()
+        for row in rows:
+            self.tree.insert("", "end", iid=str(row[0]), values=row)
+        self._last_key = rows[-1][0]
+        if self._first_key is None:
+            self._first_key = rows[0][0]
+
+        children = self.tree.get_children()
+        overflow = len(children) - self.max_rows
+        if overflow > 0:
+            self.tree.delete(*children[:overflow])
+            self._first_key = int(children[overflow])
+            self._at_start = False
+            top -= overflow
+        self._scroll_to(top)
+
+    def _prepend(self, rows):
+        self._request = None
+        self._at_start = len(rows) < self.page_size
+        self._update_status()
+        if not rows:
+            return
+
+        top = self._top_index() + len(rows)
+        for row in reversed(rows):
+            self.tree.insert("", 0, iid=str(row[0]), values=row)
+        self._first_key = rows[0][0]
+
+        children = self.tree.get_children()
+        overflow = len(children) - self.max_rows
+        if overflow > 0:
+            self.tree.delete(*children[-overflow:])
+            self._last_key = int(children[-overflow - 1])
+            self._at_end = False
+        self._scroll_to(top)
+
+    def _top_index(self):
+        count = len(self.tree.get_children())
+        return round(self.tree.yview()[0] * count) if count else 0
+
+    def _scroll_to(self, index):
+        count = len(self.tree.get_children())
+        if count:
+            self.tree.yview_moveto(max(0, index) / count)
+
+    def _show_total(self, total):
+        self._count_request = None
+        self._total = total
+        self._update_status()
+
+    def _update_status(self):
+        if self._request is not None:
+            text = "Loading…"
+        elif self._total is None:
+            text = ""
+        else:
+            text = f"{self._total} rows"
+        self.status_label.config(text=text)
+
+    def _show_error(self, e):
+        # Stop paging until reload() so a broken query is not retried on every scroll.
+        self._request = None
+        self._at_start = self._at_end = True
+        self.status_label.config(text="")
+        messagebox.showerror("Database Error", f"Could not load data:\n{e}")
@@ -0,0 +1,244 @@
+"""Timing for db_handler calls and the SQL statements they run.
+
+Every wrapped db_handler call and every statement executed on db_handler's
+connections is recorded into a latency histogram plus a window of recent
+samples (for rolling percentiles). Calls slower than SLOW_CALL_MS are
+appended to slow_queries.log together with the statements they ran.
+
+    REWORK_QUERY_STATS=0          turn recording off
+    REWORK_SLOW_QUERY_MS=200      slow-log threshold in milliseconds
+    REWORK_SLOW_QUERY_LOG=path    slow log file (default slow_queries.log)
+    REWORK_QUERY_STATS_FILE=path  dump the stats as JSON when the app exits
+"""
+
+import atexit
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime
+
+ENABLED = os.environ.get("REWORK_QUERY_STATS", "1") != "0"
+SLOW_CALL_MS = float(os.environ.get("REWORK_SLOW_QUERY_MS", "200"))
+SLOW_LOG_PATH = os.environ.get("REWORK_SLOW_QUERY_LOG", "slow_queries.log")
+SLOW_LOG_MAX_BYTES = 1024 * 1024
+SLOW_LOG_BACKUPS = 3
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is open.
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Samples kept per key for the rolling percentiles.
+RECENT_SAMPLES = 1000
+SQL_TEXT_LIMIT = 300
+
+_lock = threading.Lock()
+_stats = {}
+_local = threading.local()
+_slow_log = None
+_started_at = datetime.now()
+
+
+class _Stat:
+    __slots__ = ("calls", "total", "max", "slow", "buckets", "recent")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.slow = 0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+
+def _normalise_sql(sql):
+    return re.sub(r"\s+", " ", sql).strip()[:SQL_TEXT_LIMIT]
+
+
+def record(kind, name, seconds, slow=False):
+    """Adds one sample (seconds) for name; kind is "call" or "sql"."""
+    ms = seconds * 1000
+    with _lock:
+        stat = _stats.get((kind, name))
+        if stat is None:
+            stat = _stats[(kind, name)] = _Stat()
+        stat.calls += 1
+        stat.total += ms
+        stat.max = max(stat.max, ms)
+        stat.slow += slow
+        stat.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+        stat.recent.append(ms)
+
+
+def _active_calls():
+    calls = getattr(_local, "calls", None)
+    if calls is None:
+        calls = _local.calls = []
+    return calls
+
+
+def _log_slow(name, ms, statements):
+    global _slow_log
+    with _lock:
+        if _slow_log is None:
+            handler = logging.handlers.RotatingFileHandler(
+                SLOW_LOG_PATH,
+                maxBytes=SLOW_LOG_MAX_BYTES,
+                backupCount=SLOW_LOG_BACKUPS,
+                encoding="utf-8",
+                delay=True,
+            )
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            _slow_log = logging.getLogger("rework.slow_queries")
+            _slow_log.propagate = False
+            _slow_log.setLevel(logging.INFO)
+            _slow_log.addHandler(handler)
+    lines = [f"{name} took {ms:.1f} ms [{threading.current_thread().name}]"]
+    lines.extend(f"    {sql_ms:8.1f} ms  {sql}" for sql, sql_ms in statements)
+    _slow_log.info("\n".join(lines))
+
+
+def timed(func):
+    """Records each call of func, and logs it with its statements if slow."""
+    if not ENABLED:
+        return func
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        calls = _active_calls()
+        statements = []
+        calls.append(statements)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            calls.pop()
+            slow = elapsed * 1000 >= SLOW_CALL_MS
+            record("call", name, elapsed, slow)
+            if slow:
+                _log_slow(name, elapsed * 1000, statements)
+
+    return wrapper
+
+
+def _record_statement(sql, started):
+    elapsed = time.perf_counter() - started
+    sql = _normalise_sql(sql)
+    record("sql", sql, elapsed)
+    for statements in getattr(_local, "calls", ()):
+        statements.append((sql, elapsed * 1000))
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Times execute/executemany (up to the first row for a SELECT; fetching
+    the rest is part of the calling function's time)."""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_statement(sql, started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_statement(sql, started)
+
+
+class TimedConnection(sqlite3.Connection):
+    """A connection whose cursors, including those made by the execute()
+    shortcuts, are TimedCursors."""
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def connection_factory():
+    """The factory to pass to sqlite3.connect()."""
+    return TimedConnection if ENABLED else sqlite3.Connection
+
+
+def _percentile(sorted_samples, p):
+    if not sorted_samples:
+        return 0.0
+    return sorted_samples[min(len(sorted_samples) - 1, int(p / 100 * len(sorted_samples)))]
+
+
+def snapshot(kind=None):
+    """Returns a list of per-call/statement stats dicts, by total time."""
+    with _lock:
+        items = [
+            (key, stat.calls, stat.total, stat.max, stat.slow, list(stat.buckets),
+             sorted(stat.recent))
+            for key, stat in _stats.items()
+            if kind is None or key[0] == kind
+        ]
+    rows = []
+    for (row_kind, name), calls, total, max_ms, slow, buckets, recent in items:
+        rows.append(
+            {
+                "kind": row_kind,
+                "name": name,
+                "calls": calls,
+                "total_ms": round(total, 3),
+                "mean_ms": round(total / calls, 3),
+                "p50_ms": round(_percentile(recent, 50), 3),
+                "p95_ms": round(_percentile(recent, 95), 3),
+                "p99_ms": round(_percentile(recent, 99), 3),
+                "max_ms": round(max_ms, 3),
+                "slow": slow,
+                "histogram": {
+                    (f"<={bound}" if i < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}"): n
+                    for i, (bound, n) in enumerate(
+                        zip(BUCKETS_MS + (None,), buckets)
+                    )
+                    if n
+                },
+            }
+        )
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows
+
+
+def report():
+    """snapshot() with when recording started, for dumps and the server."""
+    return {
+        "since": _started_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "dumped": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "slow_call_ms": SLOW_CALL_MS,
+        "stats": snapshot(),
+    }
+
+
+def dump(path, stats_report=None):
+    """Writes report() (or the given report) to path as JSON; returns path."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(stats_report or report(), f, indent=2)
+    return path
+
+
+def reset():
+    global _started_at
+    with _lock:
+        _stats.clear()
+        _started_at = datetime.now()
+
+
+if ENABLED and os.environ.get("REWORK_QUERY_STATS_FILE"):
+    atexit.register(dump, os.environ["REWORK_QUERY_STATS_FILE"])
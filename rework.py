@@ -0,0 +1,287 @@
+"""Command-line access to the rework database, without the GUI.
+
+    python -m rework query PCB_ID [PCB_ID ...]   (or PCB IDs on stdin)
+    python -m rework query --search "bridge U12"
+    python -m rework import entries.csv
+    python -m rework export rework_log --range "Last Shift" --format csv
+    python -m rework export traceability --range Yesterday --model M1 -o t.parquet
+    python -m rework backup snapshot
+    python -m rework archive --days 180
+    python -m rework stats --days 7
+
+Rows are written to stdout (or --output) as they are read, as JSON lines by
+default or CSV with --format csv. export can also write Parquet, and writes
+CSV/Parquet files through export.py (a .csv.gz output is gzipped). Only
+db_handler is loaded up front, so a command starts in a fraction of a second.
+"""
+
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime, timedelta
+
+import db_handler
+import export
+from date_ranges import ALL, RANGE_PRESETS, SHIFT_NAMES, date_filter
+
+SNAPSHOT_COLUMNS = (
+    "pcb_id",
+    "status",
+    "rework_no",
+    "rework_action",
+    "rework_date",
+    "rework_done_by",
+)
+KPI_COLUMNS = (
+    "day",
+    "model",
+    "rejected",
+    "reworked",
+    "reworked_multi",
+    "rework_fpy",
+    "backlog",
+)
+
+
+class RowWriter:
+    """Writes rows as JSON lines or CSV, header first for CSV."""
+
+    def __init__(self, out, fmt, columns):
+        self.out = out
+        self.fmt = fmt
+        self.columns = list(columns)
+        if fmt == "csv":
+            self.csv = csv.writer(out)
+            self.csv.writerow(self.columns)
+
+    def write(self, row):
+        if self.fmt == "csv":
+            self.csv.writerow(row)
+        else:
+            _write_json(self.out, dict(zip(self.columns, row)))
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write(row)
+
+
+def _open_output(path):
+    if not path or path == "-":
+        return sys.stdout
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _filters(args):
+    """start/end/shift keyword arguments from --range/--from/--to/--shift."""
+    filters = date_filter(args.range, args.shift)
+    if args.date_from:
+        filters["start"] = _parse_time(args.date_from)
+    if args.date_to:
+        filters["end"] = _parse_time(args.date_to)
+    return filters
+
+
+def _write_json(out, record):
+    out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+def cmd_query(args, out):
+    if args.search:
+        columns = ("source", "pcb_id", "date", "text", "detail")
+        writer = RowWriter(out, args.format, columns)
+        writer.write_rows(db_handler.search_history(args.search, args.limit))
+        return 0
+
+    writer = RowWriter(out, args.format, SNAPSHOT_COLUMNS)
+    entry_columns = db_handler.ENTRIES_COLUMNS.split(", ")
+    for pcb_id in args.pcb_ids or (line.strip() for line in sys.stdin):
+        if not pcb_id:
+            continue
+        snapshot = db_handler.get_pcb_snapshot(pcb_id)
+        if snapshot["entry"]:
+            status = "pending"
+        else:
+            status = "reworked" if snapshot["reworks"] else "unknown"
+
+        if args.format == "csv":
+            # One line per rework; a PCB without reworks still gets a line.
+            for rework in snapshot["reworks"] or [(None,) * 4]:
+                writer.write((pcb_id, status) + tuple(rework))
+        else:
+            entry = snapshot["entry"]
+            _write_json(
+                out,
+                {
+                    "pcb_id": pcb_id,
+                    "status": status,
+                    "entry": dict(zip(entry_columns, entry)) if entry else None,
+                    "reworks": [
+                        dict(zip(SNAPSHOT_COLUMNS[2:], rework))
+                        for rework in snapshot["reworks"]
+                    ],
+                },
+            )
+        # Flush per PCB so a batch job reading a pipe sees answers as they come.
+        out.flush()
+    return 0
+
+
+def cmd_import(args, out):
+    from bulk_import import import_entries_file
+
+    result = import_entries_file(args.file)
+    _write_json(out, result)
+    return 1 if result["invalid"] else 0
+
+
+def cmd_export(args, out):
+    if args.format in export.FORMATS and args.output and args.output != "-":
+        rows = export.export_view(
+            args.view,
+            args.output,
+            args.format,
+            model=args.model,
+            chunk_size=args.chunk_size,
+            **_filters(args),
+        )
+        print(f"{rows} rows written to {args.output}", file=sys.stderr)
+        return 0
+    if args.format == "parquet":
+        raise SystemExit("rework export: --format parquet needs --output FILE")
+
+    names, chunks = export.stream_view(
+        args.view, model=args.model, chunk_size=args.chunk_size, **_filters(args)
+    )
+    writer = RowWriter(out, args.format, names)
+    for rows in chunks:
+        writer.write_rows(rows)
+    return 0
+
+
+def cmd_backup(args, out):
+    import backup
+
+    if args.kind == "excel":
+        result = backup.write_backup(**_filters(args))
+    elif args.kind == "incremental":
+        result = backup.write_incremental_backup()
+    else:
+        result = backup.write_snapshot_backup()
+    _write_json(out, {"backup": args.kind, "result": result})
+    return 0
+
+
+def cmd_archive(args, out):
+    moved = db_handler.archive_old_rows(args.days)
+    _write_json(out, {"archived": moved})
+    return 0
+
+
+def cmd_stats(args, out):
+    cur = db_handler.get_connection().cursor()
+    cur.execute("SELECT model, COUNT(*) FROM entries GROUP BY model ORDER BY model")
+    pending = dict(cur.fetchall())
+    stats = {
+        "database": db_handler.get_db_path(),
+        "schema_version": db_handler.get_schema_version(),
+        "entries": db_handler.count_entries(),
+        "rework_log": db_handler.count_rework_logs(),
+        "pending_by_model": pending,
+    }
+    if args.days:
+        date_from = datetime.now().date() - timedelta(days=args.days - 1)
+        summary = db_handler.get_kpi_summary(date_from.isoformat())
+        stats["kpi"] = [dict(zip(KPI_COLUMNS, row)) for row in summary]
+    _write_json(out, stats)
+    return 0
+
+
+def _add_range_options(parser):
+    parser.add_argument("--range", default=ALL, choices=RANGE_PRESETS)
+    parser.add_argument("--shift", default=ALL, choices=SHIFT_NAMES)
+    parser.add_argument("--from", dest="date_from", help="YYYY-MM-DD[ HH:MM]")
+    parser.add_argument("--to", dest="date_to", help="YYYY-MM-DD[ HH:MM], exclusive")
+
+
+def build_parser():
+    # Accepted after the command name, e.g. "export entries --format csv".
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", help="database file (default: rework_data.db)")
+    common.add_argument("--output", "-o", help="write here instead of stdout")
+
+    parser = argparse.ArgumentParser(prog="rework", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_command(name, help, formats=("jsonl", "csv")):
+        command = commands.add_parser(name, help=help, parents=[common])
+        command.add_argument("--format", choices=formats, default="jsonl")
+        return command
+
+    query = add_command("query", "look up PCB histories")
+    query.add_argument("pcb_ids", nargs="*")
+    query.add_argument("--search", help="full-text search instead of PCB IDs")
+    query.add_argument("--limit", type=int, default=db_handler.SEARCH_LIMIT)
+    query.set_defaults(func=cmd_query)
+
+    import_ = add_command("import", "import entries from CSV/XLSX")
+    import_.add_argument("file")
+    import_.set_defaults(func=cmd_import)
+
+    export_ = add_command(
+        "export",
+        "stream a table or the traceability view",
+        formats=("jsonl",) + export.FORMATS,
+    )
+    export_.add_argument("view", choices=sorted(export.VIEWS))
+    export_.add_argument("--model", help="only boards of this model")
+    export_.add_argument(
+        "--chunk-size",
+        type=int,
+        default=export.EXPORT_CHUNK_ROWS,
+        help="rows per chunk",
+    )
+    _add_range_options(export_)
+    # CSV/Parquet files are written by export.py itself, atomically.
+    export_.set_defaults(func=cmd_export, writes_output=True)
+
+    backup = add_command("backup", "take a backup")
+    backup.add_argument("kind", choices=("excel", "incremental", "snapshot"))
+    _add_range_options(backup)
+    backup.set_defaults(func=cmd_backup)
+
+    archive = add_command("archive", "move old rows to archives")
+    archive.add_argument("--days", type=int, default=db_handler.ARCHIVE_AFTER_DAYS)
+    archive.set_defaults(func=cmd_archive)
+
+    stats = add_command("stats", "row counts and KPIs")
+    stats.add_argument("--days", type=int, default=0, help="include N days of KPIs")
+    stats.set_defaults(func=cmd_stats)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        db_handler.set_db_path(args.db)
+    db_handler.init_db()
+    if getattr(args, "writes_output", False) and args.format in export.FORMATS:
+        out = sys.stdout if args.output in (None, "-") else None
+    else:
+        out = _open_output(args.output)
+    try:
+        return args.func(args, out)
+    except BrokenPipeError:
+        # e.g. piped into head; stop quietly
+        return 0
+    finally:
+        if out not in (sys.stdout, None):
+            out.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Client side of service mode: runs db_handler calls on a rework_server.
+
+Start main.py with REWORK_SERVER_URL=http://host:8765 to use a server
+instead of the local rework_data.db. install() swaps the functions below on
+db_handler (and the backup and export jobs on backup and export) for calls
+to the server, so it must run before anything imports names from those
+modules.
+"""
+
+import json
+import os
+import sqlite3
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+SERVER_URL_ENV = "REWORK_SERVER_URL"
+# Shared secret: when the server has one, every request must send it.
+SERVER_TOKEN_ENV = "REWORK_SERVER_TOKEN"
+TOKEN_HEADER = "X-Rework-Token"
+TIMEOUT_SECONDS = 30
+
+# db_handler functions the server runs on its reader pool...
+READ_FUNCTIONS = (
+    "validate_admin",
+    "validate_operator",
+    "get_all_models",
+    "search_entry_by_pcbid",
+    "get_all_reworks_by_pcbid",
+    "get_rework_count",
+    "get_rework_log_by_pcbid",
+    "get_pcb_snapshot",
+    "fetch_with_rework",
+    "fetch_before_rework",
+    "fetch_all_entries",
+    "search_history",
+    "get_defect_pareto",
+    "get_rollup_stages",
+    "complete_pcb_id",
+    "is_known_pcb_id",
+    "pcb_index_age",
+    "refresh_pcb_index",
+    "fetch_entries_page",
+    "fetch_rework_log_page",
+    "count_entries",
+    "count_rework_logs",
+)
+# ...and those it queues for its single writer thread.
+WRITE_FUNCTIONS = (
+    "insert_model",
+    "insert_entry",
+    "insert_entries_bulk",
+    "insert_rework",
+    "submit_rework",
+    "add_operator",
+    "delete_entry_by_pcb_id",
+    "get_kpi_summary",
+)
+# backup jobs, run on the server so the files land next to its database.
+BACKUP_FUNCTIONS = ("write_backup", "write_incremental_backup", "write_snapshot_backup")
+EXPORT_FUNCTIONS = ("write_export",)
+# Never served: they wipe or move data, or return passwords. In service mode
+# they raise instead, and must be run on the server machine.
+SERVER_ONLY_FUNCTIONS = ("delete_all_data", "archive_old_rows", "list_all_operators")
+
+# Server-side exceptions re-raised as the same type, so callers such as
+# add_new_entry can keep catching sqlite3.IntegrityError.
+_ERROR_TYPES = {
+    "IntegrityError": sqlite3.IntegrityError,
+    "OperationalError": sqlite3.OperationalError,
+    "ValueError": ValueError,
+    "TypeError": TypeError,
+}
+
+
+class RemoteError(Exception):
+    """The server could not be reached or failed with an unmapped error."""
+
+
+def encode_value(value):
+    """Makes call arguments and results JSON-safe (datetimes are tagged)."""
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    if isinstance(value, dict):
+        return {key: encode_value(item) for key, item in value.items()}
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    # lists, tuples, and generators such as import records
+    return [encode_value(item) for item in value]
+
+
+def decode_value(value):
+    """Reverses encode_value; lists nested in lists come back as tuples,
+    the way sqlite3 returns rows."""
+    if isinstance(value, dict):
+        if set(value) == {"$datetime"}:
+            return datetime.fromisoformat(value["$datetime"])
+        return {key: decode_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [
+            tuple(decode_value(item) for item in row) if isinstance(row, list)
+            else decode_value(row)
+            for row in value
+        ]
+    return value
+
+
+class ReworkClient:
+    def __init__(self, url, timeout=TIMEOUT_SECONDS, token=None):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.token = token
+
+    def _request(self, path, body=None):
+        data = None if body is None else json.dumps(body).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers[TOKEN_HEADER] = self.token
+        request = urllib.request.Request(self.url + path, data=data, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                error = json.loads(e.read())
+            except ValueError:
+                raise RemoteError(f"Rework server error {e.code}") from None
+            error_type = _ERROR_TYPES.get(error.get("type"), RemoteError)
+            raise error_type(error.get("error", "")) from None
+        except urllib.error.URLError as e:
+            raise RemoteError(f"Cannot reach rework server at {self.url}: {e.reason}")
+
+    def call(self, name, *args, **kwargs):
+        body = {"args": encode_value(args), "kwargs": encode_value(kwargs)}
+        return decode_value(self._request(f"/rpc/{name}", body)["result"])
+
+    def health(self):
+        return self._request("/health")
+
+    def stats(self):
+        """The server's query_stats.report()."""
+        return self._request("/stats")
+
+
+def _remote(client, name):
+    def call(*args, **kwargs):
+        return client.call(name, *args, **kwargs)
+
+    call.__name__ = name
+    return call
+
+
+def _server_only(name):
+    def call(*args, **kwargs):
+        raise RemoteError(
+            f"{name} is not available in service mode; run it on the server"
+        )
+
+    call.__name__ = name
+    return call
+
+
+def install(url, timeout=TIMEOUT_SECONDS, token=None):
+    """Points db_handler, backup and export at the server at url; returns the
+    client. token defaults to the REWORK_SERVER_TOKEN environment variable."""
+    import backup
+    import db_handler
+    import export
+
+    client = ReworkClient(url, timeout, token or os.environ.get(SERVER_TOKEN_ENV))
+    for name in READ_FUNCTIONS + WRITE_FUNCTIONS:
+        setattr(db_handler, name, _remote(client, name))
+    for name in BACKUP_FUNCTIONS:
+        setattr(backup, name, _remote(client, name))
+    for name in EXPORT_FUNCTIONS:
+        setattr(export, name, _remote(client, name))
+    for name in SERVER_ONLY_FUNCTIONS:
+        setattr(db_handler, name, _server_only(name))
+    # The server owns the schema; at startup just check it is reachable.
+    db_handler.init_db = client.health
+    return client
@@ -0,0 +1,227 @@
+"""Serves the rework database to stations over HTTP/JSON (service mode).
+
+    python rework_server.py [--host 127.0.0.1] [--port 8765] [--db PATH]
+                            [--token SECRET]
+
+The server is the only process that opens the database. Requests are
+handled on a fixed pool of threads, each with its own reader connection;
+every write is queued to one writer thread, so writes never contend for
+the database lock. Stations run main.py with REWORK_SERVER_URL pointing at
+the server (see rework_client.py). GET /stats returns the server's query
+timings.
+
+The server binds to 127.0.0.1 by default. To serve other machines, give a
+shared token (--token or REWORK_SERVER_TOKEN): every request must then carry
+it, and stations set the same REWORK_SERVER_TOKEN. Calls that wipe or move
+data or list operator passwords (rework_client.SERVER_ONLY_FUNCTIONS) are
+never served; run them on the server machine. Backup and export jobs take
+only filters and a format, so their files stay in the server's folders under
+its retention.
+"""
+
+import argparse
+import hmac
+import ipaddress
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import backup
+import db_handler
+import export
+import query_stats
+from rework_client import (
+    READ_FUNCTIONS,
+    WRITE_FUNCTIONS,
+    SERVER_TOKEN_ENV,
+    TOKEN_HEADER,
+    encode_value,
+    decode_value,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+READER_THREADS = 8
+
+
+# Backup and export jobs are served through these fixed signatures: a station
+# picks only the filters and format, never the output folders or retention,
+# and any other keyword is a TypeError.
+def _write_backup(start=None, end=None, shift=None):
+    return backup.write_backup(start, end, shift)
+
+
+def _write_incremental_backup():
+    return backup.write_incremental_backup()
+
+
+def _write_snapshot_backup():
+    return backup.write_snapshot_backup()
+
+
+def _write_export(view, fmt="csv", start=None, end=None, shift=None, model=None):
+    if view not in export.VIEWS:
+        raise ValueError(f"Unknown export view {view!r}")
+    if fmt not in export.FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    return export.write_export(view, fmt, start, end, shift, model)
+
+
+JOB_OPS = {
+    "write_backup": _write_backup,
+    "write_incremental_backup": _write_incremental_backup,
+    "write_snapshot_backup": _write_snapshot_backup,
+    "write_export": _write_export,
+}
+
+READ_OPS = {name: getattr(db_handler, name) for name in READ_FUNCTIONS}
+READ_OPS.update(JOB_OPS)
+WRITE_OPS = {name: getattr(db_handler, name) for name in WRITE_FUNCTIONS}
+
+
+class ReworkServer(HTTPServer):
+    """An HTTPServer that handles requests on a fixed thread pool and runs
+    writes on a single writer thread."""
+
+    def __init__(self, address, readers=READER_THREADS, token=None):
+        super().__init__(address, ReworkRequestHandler)
+        self.token = token
+        self.pool = ThreadPoolExecutor(readers, thread_name_prefix="rework-read")
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix="rework-write")
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def call(self, name, args, kwargs):
+        if name in WRITE_OPS:
+            return self.writer.submit(WRITE_OPS[name], *args, **kwargs).result()
+        return READ_OPS[name](*args, **kwargs)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+        self.writer.shutdown(wait=True)
+
+
+class ReworkRequestHandler(BaseHTTPRequestHandler):
+    def _authorised(self):
+        token = self.server.token
+        if token and not hmac.compare_digest(
+            self.headers.get(TOKEN_HEADER, "").encode(), token.encode()
+        ):
+            self._send(401, {"error": "Missing or wrong server token", "type": "Auth"})
+            return False
+        return True
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if not self._authorised():
+            return
+        if self.path == "/health":
+            self._send(
+                200, {"ok": True, "schema_version": db_handler.get_schema_version()}
+            )
+        elif self.path == "/stats":
+            self._send(200, query_stats.report())
+        else:
+            self._send(404, {"error": f"Unknown path {self.path}", "type": "NotFound"})
+
+    def do_POST(self):
+        if not self._authorised():
+            return
+        name = self.path[len("/rpc/") :] if self.path.startswith("/rpc/") else None
+        if name not in READ_OPS and name not in WRITE_OPS:
+            self._send(404, {"error": f"Unknown call {self.path}", "type": "NotFound"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            args = decode_value(request.get("args", []))
+            kwargs = decode_value(request.get("kwargs", {}))
+            result = self.server.call(name, args, kwargs)
+        except Exception as e:
+            self._send(500, {"error": str(e), "type": type(e).__name__})
+            return
+        self._send(200, {"result": encode_value(result)})
+
+    def log_request(self, code="-", size="-"):
+        # Only errors are logged; a busy line makes several calls a second.
+        pass
+
+
+def _is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def serve(
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    db_path=None,
+    readers=READER_THREADS,
+    token=None,
+):
+    """Prepares the database and returns a ReworkServer (call serve_forever).
+
+    Raises ValueError when asked to listen beyond this machine without a token.
+    """
+    if not token and not _is_loopback(host):
+        raise ValueError(
+            f"Refusing to serve on {host} without a token "
+            f"(--token or {SERVER_TOKEN_ENV})"
+        )
+    if db_path:
+        db_handler.set_db_path(db_path)
+    db_handler.init_db()
+    db_handler.refresh_pcb_index()
+    return ReworkServer((host, port), readers, token)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", help="database file (default: rework_data.db)")
+    parser.add_argument("--readers", type=int, default=READER_THREADS)
+    parser.add_argument(
+        "--token",
+        default=os.environ.get(SERVER_TOKEN_ENV),
+        help=f"shared secret clients must send (default: ${SERVER_TOKEN_ENV})",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        server = serve(args.host, args.port, args.db, args.readers, args.token)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Rework server on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
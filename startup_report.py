@@ -0,0 +1,111 @@
+"""Measures the cold-start cost of the GUI for tracking between releases.
+
+    python startup_report.py [--top 15] [--json startup_report.json]
+
+Imports main.py in a fresh interpreter with -X importtime and reports the
+slowest top-level imports, then times init_db on a scratch copy of the
+database. Run REWORK_STARTUP_TIMING=1 python main.py to also print the time
+until the first window appears.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_imports(module="main"):
+    """Returns (total_us, [(name, self_us, cumulative_us)]) for module and the
+    imports it pulls in directly."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    # Each nesting level indents the name by two more spaces, and a module's
+    # line comes after the lines of everything it imported.
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entry = (name.strip(), int(self_us), int(cumulative_us))
+        if depth == 1:
+            children.append(entry)
+        elif depth == 0:
+            if entry[0] == module:
+                return entry[2], children
+            children = []
+    raise RuntimeError(f"{module} did not show up in -X importtime output")
+
+
+def measure_init_db():
+    """Times a cold init_db (first run) and a warm one (cached schema check)
+    against a copy of the current database, or a new one if there is none."""
+    import db_handler
+
+    source = db_handler.get_db_path()
+    scratch = tempfile.mkdtemp()
+    try:
+        target = os.path.join(scratch, db_handler.DB_NAME)
+        if os.path.exists(source):
+            shutil.copy(source, target)
+        db_handler.set_db_path(target)
+
+        started = time.perf_counter()
+        db_handler.init_db()
+        cold = time.perf_counter() - started
+
+        started = time.perf_counter()
+        db_handler.init_db()
+        warm = time.perf_counter() - started
+    finally:
+        db_handler.set_db_path(None)
+        shutil.rmtree(scratch, ignore_errors=True)
+    return cold, warm
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    total_us, imports = measure_imports()
+    cold, warm = measure_init_db()
+
+    print(f"import main: {total_us / 1000:.1f} ms")
+    for name, _, cumulative in sorted(imports, key=lambda i: -i[2])[: args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    print(f"init_db: {cold * 1000:.1f} ms cold, {warm * 1000:.2f} ms cached")
+
+    if args.json:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "import_main_ms": round(total_us / 1000, 1),
+            "imports": [
+                {"module": name, "self_ms": s / 1000, "cumulative_ms": c / 1000}
+                for name, s, c in imports
+            ],
+            "init_db_cold_ms": round(cold * 1000, 2),
+            "init_db_cached_ms": round(warm * 1000, 3),
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Merges the outboxes of station databases into a central database.
+
+    python sync.py central.db station1.db [station2.db ...]
+
+A station's outbox is off until it is registered for sync, which happens on
+its first sync (or with register_station): its history so far is queued
+then, and from there on every new entry and rework is added to sync_outbox
+as it is written. A sync copies a station's outbox rows that the central
+database has not seen yet, in batches; each batch is applied together with
+the station's new high water mark in sync_stations, so running the sync
+again (or after a crash) never applies a row twice. Merged rows are then
+pruned from the station.
+
+The central database assigns rework numbers itself: when two stations
+reworked the same PCB, the later-merged rework gets the next free number
+and the change is recorded in sync_conflicts, as are entries for a PCB that
+is already pending centrally.
+"""
+
+import argparse
+import json
+from datetime import datetime
+
+from db_handler import open_database, enable_sync_outbox
+
+SYNC_BATCH_SIZE = 1000
+
+
+def _station_id(conn):
+    cur = conn.execute("SELECT value FROM sync_info WHERE name = 'station_id'")
+    return cur.fetchone()[0]
+
+
+def _register(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        enabled = enable_sync_outbox(conn.cursor())
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    return enabled
+
+
+def register_station(station_path):
+    """Turns on a station's outbox (queueing its history) ahead of its first
+    sync. Returns False if it was already registered."""
+    station = open_database(station_path)
+    try:
+        return _register(station)
+    finally:
+        station.close()
+
+
+def _mark_central(conn):
+    """Stops the central database queueing its own (merged) rows for sync."""
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute("UPDATE sync_info SET value = 'off' WHERE name = 'outbox'")
+    conn.execute("DELETE FROM sync_outbox")
+    conn.commit()
+
+
+def _log_conflict(cur, station_id, kind, pcb_id, detail, now):
+    cur.execute(
+        """
+        INSERT INTO sync_conflicts (station_id, kind, pcb_id, detail, logged_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        (station_id, kind, pcb_id, detail, now),
+    )
+
+
+def _apply_entry(cur, row, station_id, now, stats):
+    cur.execute(
+        """
+        INSERT OR IGNORE INTO entries
+            (pcb_id, model, timestamp, rejection_stage, rejection_details, ts_epoch)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+        (
+            row["pcb_id"],
+            row["model"],
+            row["timestamp"],
+            row["rejection_stage"],
+            row["rejection_details"],
+            row["ts_epoch"],
+        ),
+    )
+    if cur.rowcount == 0:
+        _log_conflict(
+            cur,
+            station_id,
+            "duplicate_entry",
+            row["pcb_id"],
+            f"already pending; station entry from {row['timestamp']} skipped",
+            now,
+        )
+        stats["conflicts"] += 1
+        return
+    stats["entries"] += 1
+    # Reworked at another station before this entry was merged.
+    cur.execute(
+        """
+        DELETE FROM entries WHERE pcb_id = ?1 AND EXISTS (
+            SELECT 1 FROM rework_log
+            WHERE pcb_id = ?1 AND rework_epoch >= entries.ts_epoch
+        )
+        """,
+        (row["pcb_id"],),
+    )
+
+
+def _apply_rework(cur, row, station_id, now, stats):
+    cur.execute(
+        """
+        INSERT INTO rework_log (pcb_id, rework_no, rework_action, rework_date,
+                                rework_done_by, rework_epoch)
+        SELECT ?1, COALESCE(
+                   (SELECT last_rework_no FROM rework_counters WHERE pcb_id = ?1), 0
+               ) + 1, ?2, ?3, ?4, ?5
+        RETURNING rework_no
+        """,
+        (
+            row["pcb_id"],
+            row["rework_action"],
+            row["rework_date"],
+            row["rework_done_by"],
+            row["rework_epoch"],
+        ),
+    )
+    rework_no = cur.fetchone()[0]
+    stats["reworks"] += 1
+    if rework_no != row["rework_no"]:
+        _log_conflict(
+            cur,
+            station_id,
+            "rework_no",
+            row["pcb_id"],
+            f"station rework_no {row['rework_no']} stored as {rework_no}",
+            now,
+        )
+        stats["conflicts"] += 1
+    # Like submit_rework: a rework clears the PCB's pending entry.
+    cur.execute(
+        "DELETE FROM entries WHERE pcb_id = ? AND ts_epoch <= ?",
+        (row["pcb_id"], row["rework_epoch"]),
+    )
+
+
+_APPLY = {"entries": _apply_entry, "rework_log": _apply_rework}
+
+
+def sync_station(station_path, central_path, batch_size=SYNC_BATCH_SIZE, prune=True):
+    """Merges one station's outbox into the central database.
+
+    Returns {"station_id", "entries", "reworks", "conflicts", "last_seq"}.
+    """
+    station = open_database(station_path)
+    central = open_database(central_path)
+    try:
+        station_id = _station_id(station)
+        if station_id == _station_id(central):
+            raise ValueError(
+                f"{station_path} and {central_path} have the same station_id "
+                "(the same file, or one is a copy of the other)"
+            )
+        _mark_central(central)
+        known = central.execute(
+            "SELECT 1 FROM sync_stations WHERE station_id = ?", (station_id,)
+        ).fetchone()
+        if not known:
+            _register(station)
+        elif station.execute(
+            "SELECT value FROM sync_info WHERE name = 'outbox'"
+        ).fetchone()[0] != "on":
+            # Re-queueing the history would merge it into central twice.
+            raise ValueError(
+                f"{station_path} was synced before but its outbox is off "
+                "(was it used as a central database?)"
+            )
+        models = station.execute("SELECT model_name FROM models").fetchall()
+        central.executemany(
+            "INSERT OR IGNORE INTO models (model_name) VALUES (?)", models
+        )
+
+        stats = {"station_id": station_id, "entries": 0, "reworks": 0, "conflicts": 0}
+        while True:
+            row = central.execute(
+                "SELECT last_seq FROM sync_stations WHERE station_id = ?", (station_id,)
+            ).fetchone()
+            last_seq = row[0] if row else 0
+            batch = station.execute(
+                """
+                SELECT seq, table_name, payload FROM sync_outbox
+                WHERE seq > ? ORDER BY seq LIMIT ?
+                """,
+                (last_seq, batch_size),
+            ).fetchall()
+            if not batch:
+                break
+
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            cur = central.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                for _, table_name, payload in batch:
+                    _APPLY[table_name](cur, json.loads(payload), station_id, now, stats)
+                cur.execute(
+                    """
+                    INSERT INTO sync_stations (station_id, last_seq, last_sync)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (station_id) DO UPDATE SET
+                        last_seq = excluded.last_seq, last_sync = excluded.last_sync
+                    """,
+                    (station_id, batch[-1][0], now),
+                )
+            except BaseException:
+                central.rollback()
+                raise
+            else:
+                central.commit()
+            finally:
+                cur.close()
+            last_seq = batch[-1][0]
+
+        stats["last_seq"] = last_seq
+        if prune:
+            station.execute("DELETE FROM sync_outbox WHERE seq <= ?", (last_seq,))
+        return stats
+    finally:
+        station.close()
+        central.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("central", help="central database file (created if missing)")
+    parser.add_argument("stations", nargs="+", help="station database files")
+    parser.add_argument("--batch-size", type=int, default=SYNC_BATCH_SIZE)
+    parser.add_argument(
+        "--keep-outbox", action="store_true", help="do not prune merged outbox rows"
+    )
+    args = parser.parse_args(argv)
+
+    for station_path in args.stations:
+        stats = sync_station(
+            station_path,
+            args.central,
+            batch_size=args.batch_size,
+            prune=not args.keep_outbox,
+        )
+        print(
+            f"{station_path} ({stats['station_id']}): {stats['entries']} entries, "
+            f"{stats['reworks']} reworks, {stats['conflicts']} conflicts"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Monthly archives of old rework_log rows (archive_old_rows).
+
+Run from the repository root: python -m pytest tests
+"""
+
+import datetime
+
+import pytest
+
+import db_handler
+
+
+@pytest.fixture
+def db(tmp_path):
+    db_handler.set_db_path(str(tmp_path / "rework.db"))
+    db_handler.init_db()
+    yield
+    db_handler.set_db_path(None)
+
+
+def _rework_at(monkeypatch, when, pcb_id, action):
+    class At(datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls.fromisoformat(when)
+
+    monkeypatch.setattr(db_handler, "datetime", At)
+    db_handler.insert_rework(pcb_id, action, "op1")
+    monkeypatch.setattr(db_handler, "datetime", datetime.datetime)
+
+
+def test_first_rework_is_found_when_only_it_was_archived(db, monkeypatch):
+    _rework_at(monkeypatch, "2025-01-10 09:00:00", "PCB1", "Resoldered")
+    _rework_at(monkeypatch, "2026-10-18 09:00:00", "PCB1", "Replaced U12")
+
+    moved = db_handler.archive_old_rows(now=datetime.datetime(2026, 10, 18))
+    assert moved == {"2025-01": {"rework_log": 1}}
+
+    first = db_handler.get_rework_log_by_pcbid("PCB1")
+    assert (first[2], first[3]) == (1, "Resoldered")
+    assert db_handler.get_rework_log_by_pcbid("PCB2") is None
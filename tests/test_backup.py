@@ -0,0 +1,41 @@
+"""Database snapshots (backup.write_snapshot_backup / prune_snapshots).
+
+Run from the repository root: python -m pytest tests
+"""
+
+import os
+
+import pytest
+
+import backup
+import db_handler
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path):
+    db_handler.set_db_path(str(tmp_path / "rework.db"))
+    db_handler.init_db()
+    yield str(tmp_path / "snapshots")
+    db_handler.set_db_path(None)
+
+
+def test_snapshots_in_the_same_second_are_kept_apart(snapshot_dir):
+    first = backup.write_snapshot_backup(snapshot_dir)
+    second = backup.write_snapshot_backup(snapshot_dir)
+    assert first != second
+    # Both fall in the same hour, so retention keeps only the newer one.
+    assert [path for _, path in backup.list_snapshots(snapshot_dir)] == [second]
+
+
+def test_the_new_snapshot_survives_any_retention(snapshot_dir):
+    backup.write_snapshot_backup(snapshot_dir)
+    path = backup.write_snapshot_backup(snapshot_dir, keep_hourly=0, keep_daily=0)
+    assert os.listdir(snapshot_dir) == [os.path.basename(path)]
+
+
+def test_snapshots_named_to_the_second_are_still_listed(snapshot_dir):
+    os.makedirs(snapshot_dir)
+    old = os.path.join(snapshot_dir, "snapshot_20261017_120000.db.gz")
+    open(old, "wb").close()
+    new = backup.write_snapshot_backup(snapshot_dir, keep_hourly=2, keep_daily=0)
+    assert [path for _, path in backup.list_snapshots(snapshot_dir)] == [new, old]
@@ -0,0 +1,57 @@
+"""Daily KPI rollup (refresh_kpi_daily / get_kpi_summary).
+
+Run from the repository root: python -m pytest tests
+"""
+
+import datetime
+
+import pytest
+
+import db_handler
+
+
+@pytest.fixture
+def db(tmp_path):
+    db_handler.set_db_path(str(tmp_path / "kpi.db"))
+    db_handler.init_db()
+    db_handler.insert_model("M1")
+    yield
+    db_handler.set_db_path(None)
+
+
+def _rework_on(monkeypatch, day, pcb_ids):
+    class Day(datetime.datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return cls.fromisoformat(f"{day} 10:00:00")
+
+    monkeypatch.setattr(db_handler, "datetime", Day)
+    for pcb_id in pcb_ids:
+        db_handler.submit_rework(pcb_id, "Reflowed", "op1")
+    monkeypatch.setattr(db_handler, "datetime", datetime.datetime)
+
+
+def _by_day():
+    return {
+        row[0]: row[3:6] for row in db_handler.get_kpi_summary("2026-10-01", "M1")
+    }
+
+
+def test_repeat_reworks_count_against_the_first_rework_day(db, monkeypatch):
+    for pcb_id in "ABCD":
+        db_handler.insert_entry(pcb_id, "M1", "2026-10-16 08:00:00", "AOI", "Bridge")
+
+    _rework_on(monkeypatch, "2026-10-17", "ABC")
+    assert _by_day()["2026-10-17"] == (3, 0, 100.0)
+
+    _rework_on(monkeypatch, "2026-10-18", "ABCD")
+    _rework_on(monkeypatch, "2026-10-19", "A")
+    days = _by_day()
+    # (reworked, reworked_multi, rework_fpy)
+    assert days["2026-10-17"] == (3, 3, 0.0)
+    assert days["2026-10-18"] == (1, 0, 100.0)
+    assert days["2026-10-19"] == (0, 0, None)
+
+    with db_handler.write_transaction() as cur:
+        db_handler._recount_repeat_reworks(cur)
+    assert _by_day() == days
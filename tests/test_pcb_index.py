@@ -0,0 +1,33 @@
+"""The in-memory PCB ID index behind autocomplete (refresh_pcb_index).
+
+Run from the repository root: python -m pytest tests
+"""
+
+import pytest
+
+import db_handler
+
+
+@pytest.fixture
+def db(tmp_path):
+    db_handler.set_db_path(str(tmp_path / "rework.db"))
+    db_handler.init_db()
+    db_handler.insert_model("M1")
+    db_handler.refresh_pcb_index()
+    yield
+    db_handler.set_db_path(None)
+
+
+def test_rolled_back_rework_is_not_indexed(db):
+    with pytest.raises(RuntimeError):
+        with db_handler.write_transaction():
+            db_handler.insert_rework("PCB1", "Reflowed", "op1")
+            raise RuntimeError("abort")
+    assert db_handler.is_known_pcb_id("PCB1") is False
+    assert db_handler.get_rework_count("PCB1") == 0
+
+
+def test_committed_writes_are_indexed(db):
+    db_handler.insert_entry("PCB2", "M1", "2026-10-18 08:00:00", "AOI", "Bridge")
+    db_handler.submit_rework("PCB3", "Reflowed", "op1")
+    assert db_handler.complete_pcb_id("PCB") == ["PCB2", "PCB3"]
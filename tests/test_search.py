@@ -0,0 +1,37 @@
+"""Full-text search over rework and rejection history (search_history).
+
+Run from the repository root: python -m pytest tests
+"""
+
+import pytest
+
+import db_handler
+
+
+@pytest.fixture
+def db(tmp_path):
+    db_handler.set_db_path(str(tmp_path / "rework.db"))
+    db_handler.init_db()
+    db_handler.insert_model("M1")
+    yield
+    db_handler.set_db_path(None)
+
+
+def _sources(text):
+    return [(row[0], row[1]) for row in db_handler.search_history(text)]
+
+
+def test_rejections_stay_searchable_after_rework(db):
+    db_handler.insert_entry(
+        "PCB1", "M1", "2026-08-03 08:00:00", "AOI", "Solder bridge at U12"
+    )
+    db_handler.submit_rework("PCB1", "Removed bridge", "op1")
+    assert sorted(_sources("bridge")) == [("Rejection", "PCB1"), ("Rework", "PCB1")]
+    assert _sources("U12") == [("Rejection", "PCB1")]
+
+
+def test_deleted_entries_leave_the_search(db):
+    db_handler.insert_entry("PCB2", "M1", "2026-10-18 08:00:00", "ICT", "Open R5")
+    assert _sources("R5") == [("Rejection", "PCB2")]
+    db_handler.delete_entry_by_pcb_id("PCB2")
+    assert _sources("R5") == []
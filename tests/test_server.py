@@ -0,0 +1,46 @@
+"""Service mode: what rework_server lets a station run.
+
+Run from the repository root: python -m pytest tests
+"""
+
+import os
+import threading
+
+import pytest
+
+import db_handler
+import rework_client
+import rework_server
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # Backups and exports land relative to the working directory.
+    monkeypatch.chdir(tmp_path)
+    server = rework_server.serve(port=0, db_path=str(tmp_path / "server.db"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield rework_client.ReworkClient(f"http://127.0.0.1:{server.server_port}")
+    server.shutdown()
+    server.server_close()
+    db_handler.set_db_path(None)
+
+
+def test_jobs_reject_output_and_retention_arguments(client, tmp_path):
+    first = client.call("write_snapshot_backup")
+    with pytest.raises(TypeError):
+        client.call("write_snapshot_backup", keep_hourly=0, keep_daily=0)
+    with pytest.raises(TypeError):
+        client.call("write_snapshot_backup", snapshot_dir=str(tmp_path / "other"))
+    assert os.path.exists(first)
+
+    outside = tmp_path / "outside"
+    with pytest.raises(TypeError):
+        client.call("write_export", "entries", export_dir=str(outside))
+    with pytest.raises(ValueError):
+        client.call("write_export", "../entries")
+    assert not outside.exists()
+
+    result = client.call("write_export", "entries", "csv")
+    assert result["rows"] == 0
+    assert os.path.commonpath([result["file"], "exports"]) == "exports"
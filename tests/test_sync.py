@@ -0,0 +1,95 @@
+"""Merging station databases into a central one (sync.py).
+
+Run from the repository root: python -m pytest tests
+"""
+
+import sqlite3
+
+import pytest
+
+import db_handler
+import sync
+
+
+@pytest.fixture
+def station(tmp_path):
+    """Returns make(name) -> path of a new station database with model M1."""
+
+    def make(name):
+        path = str(tmp_path / f"{name}.db")
+        db_handler.set_db_path(path)
+        db_handler.init_db()
+        db_handler.insert_model("M1")
+        return path
+
+    yield make
+    db_handler.set_db_path(None)
+
+
+def _use(path):
+    db_handler.set_db_path(path)
+
+
+def _rows(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_colliding_rework_numbers_are_renumbered_and_logged(station, tmp_path):
+    central = str(tmp_path / "central.db")
+    first = station("first")
+    db_handler.insert_entry("PCB1", "M1", "2026-10-18 08:00:00", "AOI", "Bridge")
+    db_handler.submit_rework("PCB1", "Resoldered", "op1")
+    second = station("second")
+    db_handler.insert_entry("PCB1", "M1", "2026-10-18 09:00:00", "AOI", "Bridge")
+    db_handler.submit_rework("PCB1", "Replaced U12", "op2")
+    db_handler.close_connections()
+
+    first_stats = sync.sync_station(first, central)
+    second_stats = sync.sync_station(second, central)
+
+    assert first_stats["reworks"] == 1 and first_stats["conflicts"] == 0
+    assert second_stats["reworks"] == 1 and second_stats["conflicts"] == 1
+    assert _rows(
+        central, "SELECT rework_no, rework_done_by FROM rework_log ORDER BY id"
+    ) == [(1, "op1"), (2, "op2")]
+    assert _rows(central, "SELECT kind, pcb_id FROM sync_conflicts") == [
+        ("rework_no", "PCB1")
+    ]
+    assert _rows(central, "SELECT last_rework_no FROM rework_counters") == [(2,)]
+    # Both entries were reworked, so nothing is left pending centrally.
+    assert _rows(central, "SELECT COUNT(*) FROM entries") == [(0,)]
+
+
+def test_rerun_applies_nothing_twice_and_prunes_the_outbox(station, tmp_path):
+    central = str(tmp_path / "central.db")
+    path = station("line1")
+    db_handler.insert_entry("PCB2", "M1", "2026-10-18 08:00:00", "ICT", "Open")
+    db_handler.close_connections()
+
+    assert sync.sync_station(path, central)["entries"] == 1
+    assert _rows(path, "SELECT COUNT(*) FROM sync_outbox") == [(0,)]
+
+    _use(path)
+    db_handler.submit_rework("PCB2", "Reflowed", "op1")
+    db_handler.close_connections()
+    again = sync.sync_station(path, central)
+    assert (again["entries"], again["reworks"]) == (0, 1)
+    assert sync.sync_station(path, central)["reworks"] == 0
+
+    assert _rows(central, "SELECT pcb_id, rework_no FROM rework_log") == [("PCB2", 1)]
+    assert _rows(central, "SELECT COUNT(*) FROM entries") == [(0,)]
+
+
+def test_outbox_is_off_until_registered(station):
+    path = station("idle")
+    db_handler.insert_entry("PCB3", "M1", "2026-10-18 08:00:00", "AOI", "Bridge")
+    db_handler.close_connections()
+    assert _rows(path, "SELECT COUNT(*) FROM sync_outbox") == [(0,)]
+
+    assert sync.register_station(path) is True
+    assert _rows(path, "SELECT table_name FROM sync_outbox") == [("entries",)]
+    assert sync.register_station(path) is False